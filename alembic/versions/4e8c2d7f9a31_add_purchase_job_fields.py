@@ -0,0 +1,30 @@
+"""Add purchase job fields to transactions
+
+Revision ID: 4e8c2d7f9a31
+Revises: 7d3f1a9c2b4e
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8c2d7f9a31'
+down_revision: Union[str, None] = '7d3f1a9c2b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transactions', sa.Column('request_data', sa.JSON(), nullable=True))
+    op.add_column('transactions', sa.Column('response_data', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('transactions', 'response_data')
+    op.drop_column('transactions', 'request_data')
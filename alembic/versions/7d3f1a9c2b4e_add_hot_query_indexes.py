@@ -0,0 +1,61 @@
+"""Add indexes for hot proxy and transaction queries
+
+Revision ID: 7d3f1a9c2b4e
+Revises: 1c656641cb5d
+Create Date: 2026-10-18 12:00:00.000000
+
+Indexes are built CONCURRENTLY outside the migration transaction, so the tables stay writable.
+Duplicate transactions.external_id values must be cleaned up before upgrading.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f1a9c2b4e'
+down_revision: Union[str, None] = '1c656641cb5d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_proxy_user_id_active', 'proxy', ['user_id'],
+            postgresql_include=['host', 'port', 'proxy_id'],
+            postgresql_where=sa.text('active'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_proxy_active_date_end', 'proxy', ['date_end'],
+            postgresql_where=sa.text('active'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_proxy_host_port', 'proxy', ['host', 'port'],
+            postgresql_include=['user_id'],
+            postgresql_where=sa.text('active'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'uq_transactions_external_id', 'transactions', ['external_id'],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('uq_transactions_external_id', table_name='transactions',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_proxy_host_port', table_name='proxy', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_proxy_active_date_end', table_name='proxy', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_proxy_user_id_active', table_name='proxy', postgresql_concurrently=True, if_exists=True)
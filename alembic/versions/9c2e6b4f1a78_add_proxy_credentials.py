@@ -0,0 +1,32 @@
+"""Add proxy credentials
+
+Revision ID: 9c2e6b4f1a78
+Revises: e1a7c4b9d053
+Create Date: 2026-10-18 17:00:00.000000
+
+Stores user/pass from the vendor response for host:port:user:pass exports.
+Proxies bought before this revision have no credentials and are exported as host:port.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2e6b4f1a78'
+down_revision: Union[str, None] = 'e1a7c4b9d053'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('proxy', sa.Column('login', sa.String(), nullable=True))
+    op.add_column('proxy', sa.Column('password', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('proxy', 'password')
+    op.drop_column('proxy', 'login')
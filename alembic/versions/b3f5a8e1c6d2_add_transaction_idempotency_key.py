@@ -0,0 +1,39 @@
+"""Add idempotency key to transactions
+
+Revision ID: b3f5a8e1c6d2
+Revises: 4e8c2d7f9a31
+Create Date: 2026-10-18 15:00:00.000000
+
+The unique index is built CONCURRENTLY outside the migration transaction, so the table stays writable.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f5a8e1c6d2'
+down_revision: Union[str, None] = '4e8c2d7f9a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('transactions', sa.Column('idempotency_key', sa.String(length=100), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_transactions_user_idempotency_key', 'transactions', ['user_id', 'idempotency_key'],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('uq_transactions_user_idempotency_key', table_name='transactions',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('transactions', 'idempotency_key')
@@ -0,0 +1,47 @@
+"""Add webhook events inbox
+
+Revision ID: e1a7c4b9d053
+Revises: b3f5a8e1c6d2
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a7c4b9d053'
+down_revision: Union[str, None] = 'b3f5a8e1c6d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'webhook_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=50), nullable=False),
+        sa.Column('invoice_id', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('state', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_webhook_events_provider_invoice_status', 'webhook_events',
+                    ['provider', 'invoice_id', 'status'], unique=True)
+    op.create_index('ix_webhook_events_pending', 'webhook_events', ['id'],
+                    postgresql_where=sa.text("state = 'pending'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_webhook_events_pending', table_name='webhook_events')
+    op.drop_index('uq_webhook_events_provider_invoice_status', table_name='webhook_events')
+    op.drop_table('webhook_events')
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.db import get_async_session
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.config import settings
+from app.core.db import get_async_session, get_session_factory
+from app.jobs.purchase_worker import purchase_worker
 from app.orchestrators.proxy import BuyProxyOrchestrator
-from app.services import ProxyApiService, ProxyService, UserService
-from app.schemas.proxy import ProxyBuyRequest, ProxyItem, ProxyGetRequest, ProxyCheckRequest, ProxyLinkRequest
-from app.core.constants import REVERSE_PROXY_TYPE_MAPPING
+from app.services import FileExporter, ProxyApiService, ProxyService, TransactionService, UserService
+from app.schemas.proxy import ProxyBuyRequest, ProxyBuyResponse, ProxyGetRequest, ProxyCheckRequest, \
+    ProxyLinkRequest, ProxyBatchCheckRequest, ProxyListResponse, proxy_item_list_adapter
+from app.core.responses import model_response
+from app.services.file_exporter import STREAM_FORMATS
 import httpx
 import logging
 from fastapi import Query
@@ -38,11 +44,57 @@ async def get_proxy_price(
 @router.post("/buy_proxy")#response_model=ProxyBuyResponse
 async def buy_proxy(
     request: ProxyBuyRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=100),
     session: AsyncSession = Depends(get_async_session)
 ):
     orchestrator = BuyProxyOrchestrator(session)
-    result = await orchestrator.execute(request)
-    return result
+    if not settings.PURCHASE_ASYNC:
+        result = await orchestrator.execute(request, idempotency_key)
+        if isinstance(result, ProxyBuyResponse):
+            return model_response(result)
+        return result
+
+    # Асинхронный режим: резервируем средства и отдаём id задания, покупку выполнит воркер
+    reservation = await orchestrator.reserve(request, idempotency_key=idempotency_key)
+    if not reservation["success"]:
+        return reservation
+
+    job_id = reservation["transaction_id"]
+    if not reservation.get("replayed"):
+        purchase_worker.submit(job_id)
+    return {
+        "success": True,
+        "status_code": 202,
+        "error": "",
+        "job_id": job_id,
+        "status": reservation["status"],
+        "price": reservation["price"]
+    }
+
+
+@router.get("/purchase/{job_id}")
+async def get_purchase(
+    job_id: int,
+    telegram_id: str = Query(...),
+    session: AsyncSession = Depends(get_async_session)
+):
+    user = await UserService(session).get_user_by_telegram_id(telegram_id, with_balance=False)
+    transaction = await TransactionService(session).get_purchase(job_id, user.id) if user else None
+    if not transaction:
+        return {
+            "success": False,
+            "status_code": 404,
+            "error": "Purchase not found"
+        }
+
+    return {
+        "success": True,
+        "status_code": 200,
+        "error": "",
+        "job_id": transaction.id,
+        "status": transaction.status,
+        "result": transaction.response_data
+    }
 
 
 @router.post("/get-proxy-telegram-id")
@@ -56,7 +108,7 @@ async def get_proxy(
 
     telegram_id = request.telegram_id
     user_service = UserService(session)
-    user = await user_service.get_user_by_telegram_id(telegram_id)
+    user = await user_service.get_user_by_telegram_id(telegram_id, with_balance=False)
     if not user or not user:
         logger.warning(f"[USER FAILED] User or balance not found for telegram_id={telegram_id}")
         return {
@@ -68,25 +120,20 @@ async def get_proxy(
     proxy_service = ProxyService(session)
     proxies = await proxy_service.get_list_proxy_by_user(user)
 
-    proxy_dicts = []
-    for p in proxies:
-        item = ProxyItem.from_orm(p).dict()
-        item["version"] = REVERSE_PROXY_TYPE_MAPPING.get(str(p.version), "unknown")
-        proxy_dicts.append(item)
-
     if not proxies:
         return {
             "success": False,
             "status_code": 2001,
             "error": "No proxies found"
         }
-    else:
-        return {
-            "success": True,
-            "status_code": 200,
-            "error": "",
-            "proxies": proxy_dicts
-        }
+
+    # ORM -> ProxyItemResponse одним вызовом адаптера, ответ уходит готовыми байтами
+    return model_response(ProxyListResponse(
+        success=True,
+        status_code=200,
+        error="",
+        proxies=proxy_item_list_adapter.validate_python(proxies, from_attributes=True)
+    ))
 
 
 @router.post("/checker-proxy")
@@ -108,6 +155,60 @@ async def checker_proxy(
         raise HTTPException(status_code=502, detail="Price check failed")
 
 
+@router.post("/checker-proxy/batch")
+async def checker_proxy_batch(
+    request: ProxyBatchCheckRequest,
+    session: AsyncSession = Depends(get_async_session)
+):
+    logger.info(
+        f"Received /checker-proxy/batch request from telegram_id={request.telegram_id}, "
+        f"addresses={len(request.addresses) if request.addresses is not None else 'all'}"
+    )
+    # ошибки разбора адресов и апстрима возвращаются по каждому прокси в ответе, исключений здесь нет
+    service = ProxyApiService(session)
+    return await service.check_proxies(request.telegram_id, request.addresses)
+
+
+@router.get("/export-proxy")
+async def export_proxy(
+    telegram_id: str = Query(...),
+    file_type: str = Query("csv"),
+    session: AsyncSession = Depends(get_async_session),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory)
+):
+    logger.info(f"Received /export-proxy request from telegram_id={telegram_id}, file_type={file_type}")
+    if file_type not in STREAM_FORMATS:
+        return {
+            "success": False,
+            "status_code": 404,
+            "error": "Invalid file type"
+        }
+
+    user = await UserService(session).get_user_by_telegram_id(telegram_id, with_balance=False)
+    if not user:
+        logger.warning(f"[USER FAILED] User not found for telegram_id={telegram_id}")
+        return {
+            "success": False,
+            "status_code": 404,
+            "error": "User not found"
+        }
+    user_id, language = user.id, user.language
+
+    async def content():
+        # Сессия запроса закрывается до отправки тела, поэтому поток читает через свою
+        async with session_factory() as export_session:
+            async for chunk in FileExporter(export_session).stream_proxies(user_id, language, file_type):
+                yield chunk
+
+    extension, media_type = STREAM_FORMATS[file_type]
+    filename = f"proxies_{telegram_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.post("/get-link-proxy")
 async def checker_proxy(
     request: ProxyLinkRequest,
@@ -118,14 +219,14 @@ async def checker_proxy(
         f"file_type={request.file_type}"
     )
     try:
-        if request.file_type == "csv":
+        if request.file_type in STREAM_FORMATS:
             file = request.file_type
         else:
             file = "xls"
 
         telegram_id = request.telegram_id
         user_service = UserService(session)
-        user = await user_service.get_user_by_telegram_id(telegram_id)
+        user = await user_service.get_user_by_telegram_id(telegram_id, with_balance=False)
         if not user or not user:
             logger.warning(f"[USER FAILED] User or balance not found for telegram_id={telegram_id}")
             return {
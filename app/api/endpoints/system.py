@@ -1,9 +1,11 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from datetime import datetime
 from typing import Dict, Any
 import platform
 import sys
 from app.core.config import settings
+from app.core.metrics import metrics
 
 router = APIRouter()
 
@@ -42,4 +44,11 @@ def get_version() -> Dict[str, str]:
     return {
         "version": settings.VERSION,
         "build_date": "2024-03-19"
-    } 
\ No newline at end of file
+    }
+
+@router.get("/metrics", tags=["System"], response_class=PlainTextResponse)
+def get_metrics() -> str:
+    """
+    Metrics in Prometheus text format
+    """
+    return metrics.render()
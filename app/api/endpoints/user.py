@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import UserCreate, UserOut, UserLangUpdate, UserNotificationUpdate, TopUpRequest
 from app.models.user import User
@@ -19,7 +19,7 @@ router = APIRouter()
 @router.get("/user/by-telegram-id/{telegram_id}", response_model=UserOut)
 async def get_user_by_telegram_id(telegram_id: str, session: AsyncSession = Depends(get_async_session)):
     user_service = UserService(session)
-    user = await user_service.get_user_by_telegram_id(telegram_id)
+    user = await user_service.get_user_by_telegram_id(telegram_id, with_balance=False)
     
     if not user:
         return {
@@ -80,8 +80,12 @@ async def get_balance(telegram_id: str, session: AsyncSession = Depends(get_asyn
 
 
 @router.post("/get-link-topup")
-async def get_link_topup(data: TopUpRequest, session: AsyncSession = Depends(get_async_session)):
+async def get_link_topup(
+    data: TopUpRequest,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=100),
+    session: AsyncSession = Depends(get_async_session)
+):
     orchestrator = TopUpOrchestrator(session)
-    response = await orchestrator.execute(data.telegram_id, data.provider, data.amount)
+    response = await orchestrator.execute(data.telegram_id, data.provider, data.amount, idempotency_key)
 
     return response
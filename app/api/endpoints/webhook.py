@@ -1,32 +1,56 @@
 from fastapi import APIRouter, Request, Depends
-from app.orchestrators.webhook_orchestrator import WebhookOrchestrator
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db import get_async_session
 from app.factories.top_up_factory import TopUpStrategyFactory
+from app.jobs.webhook_worker import webhook_worker
+from app.services import WebhookEventService
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+# payment_status NowPayments -> статус, который понимает WebhookOrchestrator; остальные сохраняются как есть
+NOWPAYMENTS_STATUSES = {
+    "confirmed": "success",
+    "finished": "success",
+    "failed": "failed",
+    "expired": "cancelled",
+}
+
+
+def normalize_nowpayments(payload: dict) -> dict:
+    """
+    IPN NowPayments -> {invoice_id, status} как у CryptoCloud; исходные поля остаются в payload события.
+    """
+    status = payload.get("payment_status")
+    return {**payload, "invoice_id": payload.get("invoice_id"), "status": NOWPAYMENTS_STATUSES.get(status, status)}
+
+
+async def enqueue(session: AsyncSession, provider: str, data: dict) -> dict:
+    """
+    Колбек только сохраняется в inbox, применяют его воркеры (app/jobs/webhook_worker.py).
+    """
+    if not data.get("invoice_id"):
+        logger.warning(f"[WEBHOOK] {provider} callback without invoice_id: {data}")
+        return {"status": "error"}
+
+    inserted = await WebhookEventService(session).append(
+        provider, str(data["invoice_id"]), str(data.get("status")), data)
+    if inserted:
+        webhook_worker.notify()
+    else:
+        logger.info(f"[WEBHOOK] Duplicate {provider} callback for invoice_id={data['invoice_id']}")
+    return {"status": "ok"}
+
+
 @router.post("/webhook/nowpayments/")
 async def nowpayments_webhook(request: Request, session: AsyncSession = Depends(get_async_session)):
     payload = await request.json()
     logger.info(f"[WEBHOOK] NowPayments payload: {payload}")
 
     try:
-        orchestrator = WebhookOrchestrator(session)
-        await orchestrator.execute(payload)
-
-        strategy = TopUpStrategyFactory.get_strategy("nowpayments")
-        data = await strategy.process_callback(payload)
-
-        if not data["success"]:
-            logger.warning(f"[WEBHOOK] Processing failed: {data['error']}")
-            return {"status": "error"}
-
-        return {"status": "ok"}
-
+        return await enqueue(session, "nowpayments", normalize_nowpayments(payload))
     except Exception as e:
         logger.exception(f"[WEBHOOK ERROR] {e}")
         return {"status": "internal error"}
@@ -38,9 +62,7 @@ async def cryptocloud_webhook(request: Request, session: AsyncSession = Depends(
         strategy = TopUpStrategyFactory.get_strategy("cryptocloud")
         data = await strategy.process_callback(request)
 
-        orchestrator = WebhookOrchestrator(session)
-        result = await orchestrator.execute(data)
-        return result
+        return await enqueue(session, "cryptocloud", data)
     except Exception as e:
         logger.exception(f"[WEBHOOK ERROR] {e}")
-        return {"status": "internal error"}
\ No newline at end of file
+        return {"status": "internal error"}
@@ -1,16 +1,56 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from app.core.config import settings
 from fastapi.staticfiles import StaticFiles
 from app.core.middleware import InternalAuthMiddleware
 from app.core.logging_config import setup_logging
+from app.core.http_client import proxy_api_client
+from app.jobs.catalog_warmer import CatalogWarmer
+from app.jobs.export_sweeper import ExportSweeper
+from app.jobs.purchase_worker import purchase_worker
+from app.jobs.webhook_worker import webhook_worker
 
 setup_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await proxy_api_client.start()
+
+    catalog_warmer = None
+    if settings.CATALOG_WARMER_ENABLED:
+        catalog_warmer = CatalogWarmer()
+        await catalog_warmer.start()
+
+    if settings.PURCHASE_WORKERS > 0:
+        await purchase_worker.start()
+
+    if settings.WEBHOOK_WORKERS > 0:
+        await webhook_worker.start()
+
+    export_sweeper = ExportSweeper()
+    await export_sweeper.start()
+
+    try:
+        yield
+    finally:
+        await export_sweeper.stop()
+        await webhook_worker.stop()
+        await purchase_worker.stop()
+        if catalog_warmer:
+            await catalog_warmer.stop()
+        await proxy_api_client.close()
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.PROJECT_NAME,
         description=settings.DESCRIPTION,
         version=settings.VERSION,
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     app.add_middleware(InternalAuthMiddleware)
@@ -24,6 +64,8 @@ def create_app() -> FastAPI:
     app.include_router(debug.router, prefix=settings.API_V1_STR, tags=["Debug"])
     app.include_router(webhook.router, tags=["Webhook"])
 
-    app.mount("/static", StaticFiles(directory="/tmp"), name="static")
+    # Отдаются только файлы выгрузок, а не весь /tmp
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    app.mount("/static", StaticFiles(directory=settings.EXPORT_DIR), name="static")
 
     return app
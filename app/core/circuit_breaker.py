@@ -0,0 +1,104 @@
+import httpx
+import logging
+import time
+from collections import deque
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(httpx.RequestError):
+    """
+    Запрос отклонён без обращения к апстриму, так как цепь разомкнута.
+    Наследуется от httpx.RequestError, чтобы существующие обработчики отдавали 502.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuit breaker '{name}' is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_duration: float = 5.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_duration: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+
+        self.state = self.CLOSED
+        # (failed, slow) для последних window_size вызовов
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            if self.clock() - self._opened_at < self.open_duration:
+                raise CircuitOpenError(self.name)
+            self._transition(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._half_open_in_flight >= self.half_open_max_calls:
+                raise CircuitOpenError(self.name)
+            self._half_open_in_flight += 1
+
+    def record(self, failed: bool, duration: float):
+        slow = duration >= self.slow_call_duration
+
+        if self.state == self.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            if failed or slow:
+                self._open()
+            else:
+                self._transition(self.CLOSED)
+            return
+
+        self._outcomes.append((failed, slow))
+        if len(self._outcomes) < self.min_calls:
+            return
+
+        total = len(self._outcomes)
+        failure_rate = sum(1 for f, _ in self._outcomes if f) / total
+        slow_rate = sum(1 for _, s in self._outcomes if s) / total
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            logger.warning(
+                f"[BREAKER] '{self.name}' tripped: failure_rate={failure_rate:.2f}, slow_rate={slow_rate:.2f}"
+            )
+            self._open()
+
+    def release(self):
+        """Вызов отменён до получения результата: освобождаем слот пробы, не меняя состояние."""
+        if self.state == self.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def _open(self):
+        self._opened_at = self.clock()
+        self._transition(self.OPEN)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.warning(f"[BREAKER] '{self.name}' {self.state} -> {state}")
+        self.state = state
+        self._half_open_in_flight = 0
+        if state == self.CLOSED:
+            self._outcomes.clear()
@@ -1,3 +1,5 @@
+import secrets
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -15,6 +17,99 @@ class Settings(BaseSettings):
     CRYPTOCLOUD_SHOP_ID: str = "***"
     INTERNAL_API_TOKEN: str = "super - secret - token"
 
+    # Upstream proxy API client
+    PROXY_API_HTTP2: bool = False
+    PROXY_API_CONNECT_TIMEOUT: float = 5.0
+    PROXY_API_TIMEOUT: float = 15.0
+    PROXY_API_TIMEOUTS: dict[str, float] = {
+        "getprice": 10.0,
+        "getcountry": 10.0,
+        "getcount": 5.0,
+        "check": 10.0,
+        "buy": 60.0,
+    }
+    PROXY_API_MAX_CONNECTIONS: int = 100
+    PROXY_API_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    PROXY_API_KEEPALIVE_EXPIRY: float = 30.0
+    PROXY_API_CHECK_BATCH_SIZE: int = 50
+
+    # Upstream token bucket (requests per second, 0 - disabled) and max queue wait
+    # per priority class before a request is shed (buy > price > check > catalog)
+    PROXY_API_RATE_LIMIT: float = 10.0
+    PROXY_API_RATE_BURST: int = 20
+    PROXY_API_RATE_MAX_WAIT: dict[str, float] = {
+        "buy": 60.0,
+        "price": 5.0,
+        "check": 2.0,
+        "catalog": 0.5,
+    }
+    # Micro-batching of single /checker-proxy calls across users (0 - disabled)
+    PROXY_CHECK_BATCH_WINDOW_MS: int = 0
+    PROXY_CHECK_BATCH_MAX_SIZE: int = 50
+
+    # Upstream circuit breaker (per operation) and retries of idempotent reads
+    PROXY_API_BREAKER_FAILURE_RATE: float = 0.5
+    PROXY_API_BREAKER_SLOW_CALL_RATIO: float = 0.8
+    PROXY_API_BREAKER_SLOW_CALL_RATE: float = 0.8
+    PROXY_API_BREAKER_WINDOW: int = 20
+    PROXY_API_BREAKER_MIN_CALLS: int = 10
+    PROXY_API_BREAKER_OPEN_SECONDS: float = 30.0
+    PROXY_API_MAX_RETRIES: int = 2
+    PROXY_API_RETRY_BASE_DELAY: float = 0.2
+    PROXY_API_RETRY_MAX_DELAY: float = 2.0
+    PROXY_API_RETRY_BUDGET_RATIO: float = 0.2
+    PROXY_API_RETRY_BUDGET_MIN_PER_SECOND: float = 1.0
+
+    # Price quote cache (seconds)
+    PRICE_CACHE_TTL: int = 300
+    PRICE_CACHE_STALE_TTL: int = 3600
+    PRICE_BUY_MAX_AGE: int = 60
+
+    # Catalog (getcountry / getcount) cache and background warmer (seconds)
+    CATALOG_COUNTRIES_TTL: int = 600
+    CATALOG_AVAILABILITY_TTL: int = 10
+    # Last known good catalog copy, served when upstream requests are shed
+    CATALOG_FALLBACK_TTL: int = 86400
+    CATALOG_WARMER_ENABLED: bool = True
+    CATALOG_COUNTRIES_INTERVAL: int = 300
+    CATALOG_AVAILABILITY_INTERVAL: int = 30
+    CATALOG_WARMER_CONCURRENCY: int = 5
+
+    # Rows deactivated per UPDATE by the proxy expiration job
+    PROXY_EXPIRATION_BATCH_SIZE: int = 1000
+
+    # Purchases: /buy_proxy reserves funds and returns a job id, workers do the upstream buy
+    PURCHASE_ASYNC: bool = False
+    PURCHASE_WORKERS: int = 4
+    # Jobs "processing" longer than this are flagged for manual review (at startup and on every interval)
+    PURCHASE_STALE_SECONDS: int = 600
+    PURCHASE_SHUTDOWN_TIMEOUT: float = 30.0
+
+    # Idempotency-Key: how long a repeated request waits for the result of the in-flight original
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 30.0
+    IDEMPOTENCY_POLL_INTERVAL: float = 0.25
+
+    # Webhook inbox: callbacks are stored by the endpoints and applied by background workers
+    WEBHOOK_WORKERS: int = 2
+    # Idle workers re-check the inbox this often (new events also wake them immediately)
+    WEBHOOK_POLL_INTERVAL: float = 5.0
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+
+    # Proxy list export: rows fetched per server-side cursor round trip
+    EXPORT_CHUNK_SIZE: int = 1000
+    # Threads writing CSV/XLSX files, i.e. how many file exports run at once
+    EXPORT_WORKERS: int = 2
+    # zip bundles buffer their parts in memory up to this size, then spill to a temp file
+    EXPORT_SPOOL_SIZE: int = 4 * 1024 * 1024
+    # Export files are cached by content key in EXPORT_DIR (served as /static) and swept in the background
+    EXPORT_DIR: str = "/tmp/proxy_exports"
+    EXPORT_MAX_AGE: int = 86400
+    EXPORT_MAX_BYTES: int = 500 * 1024 * 1024
+    EXPORT_SWEEP_INTERVAL: int = 600
+    # /static is public: file names are an HMAC over this key, so they cannot be derived from user id
+    # and list contents. The default is random per process - set it explicitly when running several instances
+    EXPORT_SECRET: str = Field(default_factory=lambda: secrets.token_hex(32))
+
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=True
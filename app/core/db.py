@@ -12,3 +12,11 @@ async_session = async_sessionmaker(engine, expire_on_commit=False)
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Фабрика сессий для работы, которая переживает запрос (тело StreamingResponse):
+    сессия из get_async_session к этому моменту уже закрыта.
+    """
+    return async_session
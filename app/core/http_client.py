@@ -0,0 +1,203 @@
+import asyncio
+import httpx
+import logging
+import time
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.rate_limiter import OPERATION_PRIORITIES, PRIORITY_CATALOG, PRIORITY_NAMES, PriorityRateLimiter
+from app.core.retry import RetryBudget, backoff_delay
+from app.core.single_flight import SingleFlight
+from app.core.upstream_metrics import UpstreamCall
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_OPERATIONS = ("getprice", "buy", "check", "getcountry", "getcount")
+# Идемпотентные операции: одинаковые запросы можно объединять и повторять при ошибке
+IDEMPOTENT_OPERATIONS = {"getcountry", "getcount", "getprice", "check"}
+
+BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+circuit_state = metrics.gauge(
+    "proxy_api_circuit_state",
+    "Circuit breaker state per operation (0 closed, 1 half-open, 2 open)",
+    ("operation",),
+)
+circuit_rejected = metrics.counter(
+    "proxy_api_circuit_rejected_total",
+    "Upstream calls rejected by an open circuit breaker",
+    ("operation",),
+)
+upstream_retries = metrics.counter(
+    "proxy_api_retries_total",
+    "Upstream call retries",
+    ("operation",),
+)
+retry_budget_exhausted = metrics.counter(
+    "proxy_api_retry_budget_exhausted_total",
+    "Retries skipped because the retry budget was exhausted",
+    ("operation",),
+)
+
+
+class ProxyApiClient:
+    """
+    Единый клиент к API поставщика прокси.
+    Держит пул keep-alive соединений на всё время жизни приложения.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self.single_flight = SingleFlight()
+        self.breakers: dict[str, CircuitBreaker] = {}
+        for operation in UPSTREAM_OPERATIONS:
+            self._breaker(operation)
+        self.rate_limiter = PriorityRateLimiter(settings.PROXY_API_RATE_LIMIT, settings.PROXY_API_RATE_BURST)
+        self.retry_budget = RetryBudget(
+            ratio=settings.PROXY_API_RETRY_BUDGET_RATIO,
+            min_per_second=settings.PROXY_API_RETRY_BUDGET_MIN_PER_SECOND,
+        )
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.PROXY_API_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("PROXY_API_HTTP2 is enabled but 'h2' is not installed, falling back to HTTP/1.1")
+                http2 = False
+
+        return httpx.AsyncClient(
+            http2=http2,
+            transport=self._transport,
+            timeout=self._timeout(None),
+            limits=httpx.Limits(
+                max_connections=settings.PROXY_API_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PROXY_API_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.PROXY_API_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    @staticmethod
+    def _read_timeout(operation: str | None) -> float:
+        return settings.PROXY_API_TIMEOUTS.get(operation, settings.PROXY_API_TIMEOUT)
+
+    def _timeout(self, operation: str | None) -> httpx.Timeout:
+        return httpx.Timeout(self._read_timeout(operation), connect=settings.PROXY_API_CONNECT_TIMEOUT)
+
+    def _breaker(self, operation: str) -> CircuitBreaker:
+        breaker = self.breakers.get(operation)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                operation,
+                failure_rate_threshold=settings.PROXY_API_BREAKER_FAILURE_RATE,
+                slow_call_duration=self._read_timeout(operation) * settings.PROXY_API_BREAKER_SLOW_CALL_RATIO,
+                slow_call_rate_threshold=settings.PROXY_API_BREAKER_SLOW_CALL_RATE,
+                window_size=settings.PROXY_API_BREAKER_WINDOW,
+                min_calls=settings.PROXY_API_BREAKER_MIN_CALLS,
+                open_duration=settings.PROXY_API_BREAKER_OPEN_SECONDS,
+            )
+            self.breakers[operation] = breaker
+            circuit_state.set_function(lambda: BREAKER_STATES[breaker.state], operation=operation)
+        return breaker
+
+    @staticmethod
+    def build_url(operation: str) -> str:
+        return f"{settings.PROXY_API_URL}/{settings.PROXY_API_KEY}/{operation}"
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Вне lifespan (CLI, тесты) клиент создаётся при первом обращении
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        _ = self.client
+        logger.info("Proxy API client started")
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Proxy API client closed")
+        self._client = None
+
+    @staticmethod
+    def _flight_key(operation: str, params: dict | None) -> tuple:
+        normalized = tuple(sorted(
+            (name, str(value).lower()) for name, value in (params or {}).items() if value is not None
+        ))
+        return operation, normalized
+
+    async def get(self, operation: str, params: dict | None = None) -> dict:
+        """
+        Результат coalesced-операций общий для всех ожидающих, его нельзя изменять.
+        """
+        if operation in IDEMPOTENT_OPERATIONS:
+            return await self.single_flight.do(
+                self._flight_key(operation, params),
+                lambda: self._request_with_retries(operation, params),
+                operation=operation,
+            )
+        return await self._request_with_retries(operation, params)
+
+    async def _request_with_retries(self, operation: str, params: dict | None = None) -> dict:
+        max_retries = settings.PROXY_API_MAX_RETRIES if operation in IDEMPOTENT_OPERATIONS else 0
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            try:
+                return await self._request(operation, params)
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500:
+                    raise
+                if attempt >= max_retries:
+                    raise
+                if not self.retry_budget.try_withdraw():
+                    retry_budget_exhausted.inc(operation=operation)
+                    raise
+
+                attempt += 1
+                upstream_retries.inc(operation=operation)
+                delay = backoff_delay(attempt, settings.PROXY_API_RETRY_BASE_DELAY, settings.PROXY_API_RETRY_MAX_DELAY)
+                logger.warning(f"Proxy API {operation} failed ({e!r}), retry {attempt}/{max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _request(self, operation: str, params: dict | None = None) -> dict:
+        priority = OPERATION_PRIORITIES.get(operation, PRIORITY_CATALOG)
+        await self.rate_limiter.acquire(priority, settings.PROXY_API_RATE_MAX_WAIT.get(PRIORITY_NAMES[priority]))
+
+        breaker = self._breaker(operation)
+        try:
+            breaker.before_call()
+        except httpx.RequestError:
+            circuit_rejected.inc(operation=operation)
+            raise
+
+        started = time.monotonic()
+        with UpstreamCall("proxy_api", operation) as call:
+            try:
+                response = await self.client.get(
+                    self.build_url(operation),
+                    params=params,
+                    timeout=self._timeout(operation),
+                )
+            except httpx.TransportError:
+                breaker.record(failed=True, duration=time.monotonic() - started)
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+
+            call.status_code = response.status_code
+            breaker.record(failed=response.status_code >= 500, duration=time.monotonic() - started)
+            response.raise_for_status()
+            data = response.json()
+            if isinstance(data, dict) and data.get("status") == "no":
+                call.outcome = "app_error"
+            return data
+
+
+proxy_api_client = ProxyApiClient()
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+batch_size_histogram = metrics.histogram(
+    "micro_batch_size",
+    "Number of distinct items per flushed micro-batch",
+    ("batcher",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+batch_wait_histogram = metrics.histogram(
+    "micro_batch_wait_seconds",
+    "Time an item waited in the micro-batch window before its batch was sent",
+    ("batcher",),
+    buckets=(0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5),
+)
+
+
+class MicroBatcher:
+    """
+    Собирает элементы, пришедшие в течение window секунд (или до max_batch_size),
+    и отправляет их одним вызовом handler(items) -> {item: result}.
+    Каждый вызывающий получает результат по своему элементу.
+    """
+
+    def __init__(self, name: str, handler: Callable[[list], Awaitable[dict]], window: float, max_batch_size: int):
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: list[tuple[Hashable, asyncio.Future, float]] = []
+        self._distinct: set[Hashable] = set()
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item: Hashable) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, loop.time()))
+        self._distinct.add(item)
+
+        if len(self._distinct) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        self._distinct = set()
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[Hashable, asyncio.Future, float]]):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        items = list(dict.fromkeys(item for item, _, _ in batch))
+
+        batch_size_histogram.observe(len(items), batcher=self.name)
+        for _, _, queued_at in batch:
+            batch_wait_histogram.observe(now - queued_at, batcher=self.name)
+
+        try:
+            results = await self.handler(items)
+        except Exception as e:
+            logger.error(f"[BATCH] {self.name} batch of {len(items)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item, future, _ in batch:
+            if future.done():
+                continue
+            if item in results:
+                future.set_result(results[item])
+            else:
+                future.set_exception(KeyError(f"No result for {item!r} in batch {self.name}"))
@@ -1,20 +1,41 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import hmac
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from app.core.config import settings
 
+# Пути без X-Internal-Token (сравнение по префиксу)
+OPEN_PATH_PREFIXES = ("/docs", "/openapi.json", "/redoc", "/static", "/webhook/cryptocloud/")
 
-class InternalAuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        open_paths = ["/docs", "/openapi.json", "/redoc", "/static", "/webhook/cryptocloud/"]
-        if any(request.url.path.startswith(path) for path in open_paths):
-            return await call_next(request)
 
-        token = request.headers.get("X-Internal-Token")
-        if not token or token.strip() != settings.INTERNAL_API_TOKEN.strip():
-            return JSONResponse(
+class InternalAuthMiddleware:
+    """
+    Чистый ASGI-middleware: без обёртки запроса и ответа в задачи и потоки BaseHTTPMiddleware,
+    поэтому не мешает StreamingResponse. Токен и префиксы вычисляются один раз при создании.
+    """
+
+    def __init__(self, app: ASGIApp, token: str | None = None, open_paths: tuple[str, ...] = OPEN_PATH_PREFIXES):
+        self.app = app
+        self.token = (settings.INTERNAL_API_TOKEN if token is None else token).strip().encode()
+        self.open_paths = tuple(open_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.open_paths):
+            await self.app(scope, receive, send)
+            return
+
+        token = b""
+        for name, value in scope["headers"]:
+            if name == b"x-internal-token":
+                token = value.strip()
+                break
+
+        # compare_digest: время сравнения не зависит от того, сколько символов совпало
+        if not token or not hmac.compare_digest(token, self.token):
+            response = JSONResponse(
                 status_code=401,
                 content={"detail": "Unauthorized. Invalid or missing token."}
             )
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
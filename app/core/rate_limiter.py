@@ -0,0 +1,144 @@
+import asyncio
+import heapq
+import httpx
+import itertools
+import time
+from typing import Callable
+from app.core.metrics import metrics
+
+PRIORITY_BUY = 0
+PRIORITY_PRICE = 1
+PRIORITY_CHECK = 2
+PRIORITY_CATALOG = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_BUY: "buy",
+    PRIORITY_PRICE: "price",
+    PRIORITY_CHECK: "check",
+    PRIORITY_CATALOG: "catalog",
+}
+
+OPERATION_PRIORITIES = {
+    "buy": PRIORITY_BUY,
+    "getprice": PRIORITY_PRICE,
+    "check": PRIORITY_CHECK,
+    "getcountry": PRIORITY_CATALOG,
+    "getcount": PRIORITY_CATALOG,
+}
+
+queue_depth_gauge = metrics.gauge(
+    "proxy_api_rate_limit_queue_depth",
+    "Upstream requests waiting for a rate limit token",
+    ("priority",),
+)
+wait_histogram = metrics.histogram(
+    "proxy_api_rate_limit_wait_seconds",
+    "Time spent waiting for a rate limit token",
+    ("priority",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+shed_counter = metrics.counter(
+    "proxy_api_rate_limit_shed_total",
+    "Upstream requests shed because the expected wait exceeded their limit",
+    ("priority",),
+)
+
+
+class RateLimitedError(httpx.RequestError):
+    """Запрос сброшен лимитером, в апстрим не отправлялся."""
+
+    def __init__(self, priority: int):
+        super().__init__(f"Proxy API rate limit exceeded for {PRIORITY_NAMES.get(priority, priority)} requests")
+        self.priority = priority
+
+
+class PriorityRateLimiter:
+    """
+    Token bucket с очередью по приоритетам: когда токенов нет, первым получает
+    токен ожидающий с меньшим номером приоритета (buy > price > check > catalog).
+    Запрос с max_wait сбрасывается сразу, если ожидаемое ожидание больше max_wait.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+        for priority, name in PRIORITY_NAMES.items():
+            queue_depth_gauge.set_function(lambda priority=priority: self.queue_depth(priority), priority=name)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def queue_depth(self, priority: int | None = None) -> int:
+        return sum(
+            1 for p, _, future in self._waiters
+            if not future.done() and (priority is None or p == priority)
+        )
+
+    def estimated_wait(self, priority: int) -> float:
+        self._refill()
+        ahead = sum(1 for p, _, future in self._waiters if not future.done() and p <= priority)
+        return max(0.0, (ahead + 1 - self._tokens) / self.rate)
+
+    async def acquire(self, priority: int, max_wait: float | None = None):
+        if not self.enabled:
+            return
+
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        self._refill()
+        if not self.queue_depth() and self._tokens >= 1:
+            self._tokens -= 1
+            wait_histogram.observe(0.0, priority=name)
+            return
+
+        if max_wait is not None and self.estimated_wait(priority) > max_wait:
+            shed_counter.inc(priority=name)
+            raise RateLimitedError(priority)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._schedule()
+
+        started = self.clock()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # токен уже был выдан, возвращаем его следующему в очереди
+                self._tokens += 1
+                self._schedule()
+            raise
+        wait_histogram.observe(self.clock() - started, priority=name)
+
+    def _schedule(self):
+        if self._timer is not None or not self._waiters:
+            return
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self):
+        self._timer = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        self._schedule()
@@ -0,0 +1,10 @@
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Ответ из модели, сериализованной pydantic-core сразу в JSON-байты.
+    FastAPI не прогоняет такой ответ через jsonable_encoder и повторную валидацию.
+    """
+    return Response(content=model.model_dump_json(), status_code=status_code, media_type="application/json")
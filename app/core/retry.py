@@ -0,0 +1,46 @@
+import random
+import time
+from typing import Callable
+
+
+class RetryBudget:
+    """
+    Ограничивает долю повторов относительно обычных запросов: каждый запрос пополняет
+    бюджет на ratio токена, каждый повтор тратит один токен. Плюс небольшой минимум
+    повторов в секунду для низкого трафика. Во время аварии повторы не умножают нагрузку.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self._tokens = max_tokens
+        self._updated_at = clock()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+
+    def deposit(self):
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Экспоненциальная задержка с full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+from app.core.metrics import metrics
+
+singleflight_calls = metrics.counter(
+    "proxy_api_singleflight_calls_total",
+    "Upstream calls passed through single-flight, by role (leader or coalesced)",
+    ("operation", "role"),
+)
+
+
+class SingleFlight:
+    """
+    Объединяет одинаковые одновременные запросы: пока первый (leader) запрос
+    по ключу выполняется, остальные ждут его результат, а не идут в апстрим.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], operation: str = "") -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            singleflight_calls.inc(operation=operation, role="leader")
+        else:
+            singleflight_calls.inc(operation=operation, role="coalesced")
+
+        # shield: отмена одного ожидающего не должна отменять запрос для остальных
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,75 @@
+import asyncio
+import httpx
+import time
+from app.core.metrics import metrics
+
+UPSTREAM_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+upstream_duration = metrics.histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to external services",
+    ("service", "operation", "outcome"),
+    buckets=UPSTREAM_BUCKETS,
+)
+upstream_requests = metrics.counter(
+    "upstream_requests_total",
+    "Calls to external services by outcome and HTTP status",
+    ("service", "operation", "outcome", "status"),
+)
+
+
+def classify_error(error: BaseException) -> str:
+    if isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return "http_error"
+    if isinstance(error, httpx.TransportError):
+        return "transport_error"
+    return "error"
+
+
+class UpstreamCall:
+    """
+    Замер одного вызова внешнего сервиса:
+
+        with UpstreamCall("proxy_api", "buy") as call:
+            response = await client.get(...)
+            call.status_code = response.status_code
+            if data.get("status") == "no":
+                call.outcome = "app_error"
+
+    outcome по умолчанию: success, http_error для статусов >= 400, для исключений - по типу ошибки.
+    """
+
+    def __init__(self, service: str, operation: str):
+        self.service = service
+        self.operation = operation
+        self.status_code: int | None = None
+        self.outcome: str | None = None
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.monotonic() - self._started
+        if isinstance(exc, httpx.HTTPStatusError):
+            self.status_code = exc.response.status_code
+
+        outcome = self.outcome
+        if exc is not None:
+            outcome = classify_error(exc)
+        elif outcome is None:
+            outcome = "http_error" if self.status_code and self.status_code >= 400 else "success"
+
+        upstream_duration.observe(duration, service=self.service, operation=self.operation, outcome=outcome)
+        upstream_requests.inc(
+            service=self.service,
+            operation=self.operation,
+            outcome=outcome,
+            status=self.status_code or "",
+        )
+        return False
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from app.core.config import settings
+from app.core.constants import PROXY_TYPE_MAPPING
+from app.core.metrics import metrics
+from app.services.catalog_service import CatalogService
+
+logger = logging.getLogger(__name__)
+
+refresh_duration = metrics.histogram(
+    "catalog_refresh_duration_seconds",
+    "Duration of a full catalog refresh cycle",
+    ("kind",),
+)
+refresh_errors = metrics.counter(
+    "catalog_refresh_errors_total",
+    "Failed catalog entry refreshes",
+    ("kind",),
+)
+catalog_staleness = metrics.gauge(
+    "catalog_staleness_seconds",
+    "Seconds since the oldest catalog entry was last refreshed successfully",
+    ("kind",),
+)
+
+
+class CatalogWarmer:
+    """
+    Фоновое обновление кэша каталога: getcountry для каждой версии из PROXY_TYPE_MAPPING и без версии
+    (/countries по умолчанию) и getcount для каждой пары (версия, страна), чтобы эндпоинты всегда читали из кэша.
+    """
+
+    def __init__(self, catalog: CatalogService | None = None):
+        self.catalog = catalog or CatalogService()
+        self.countries: dict[str, list] = {}
+        # ключ записи -> время последнего успешного обновления
+        self.refreshed_at: dict[str, dict[tuple, float]] = {"countries": {}, "availability": {}}
+        self._semaphore = asyncio.Semaphore(settings.CATALOG_WARMER_CONCURRENCY)
+        self._tasks: list[asyncio.Task] = []
+
+        for kind in self.refreshed_at:
+            catalog_staleness.set_function(lambda kind=kind: self.staleness(kind), kind=kind)
+
+    def staleness(self, kind: str) -> float:
+        entries = self.refreshed_at[kind]
+        if not entries:
+            return 0.0
+        return time.time() - min(entries.values())
+
+    @staticmethod
+    def _ttl(interval: int, default_ttl: int) -> int:
+        # Запись должна пережить как минимум пару циклов, иначе чтения снова будут промахиваться
+        return max(default_ttl, interval * 3)
+
+    async def _guarded(self, kind: str, key: tuple, coro_fn):
+        async with self._semaphore:
+            try:
+                result = await coro_fn()
+            except Exception as e:
+                refresh_errors.inc(kind=kind)
+                logger.warning(f"[CATALOG] Failed to refresh {kind} {key}: {e}")
+                return None
+            self.refreshed_at[kind][key] = time.time()
+            return result
+
+    async def refresh_countries(self) -> dict[str, list]:
+        started = time.perf_counter()
+        ttl = self._ttl(settings.CATALOG_COUNTRIES_INTERVAL, settings.CATALOG_COUNTRIES_TTL)
+
+        async def refresh(api_version: str | None):
+            countries = await self._guarded(
+                "countries", (api_version,),
+                lambda: self.catalog.refresh_countries(api_version, ttl=ttl),
+            )
+            # список без версии нужен только /countries: getcount без версии не запрашивается
+            if countries is not None and api_version is not None:
+                self.countries[api_version] = countries
+
+        await asyncio.gather(*(refresh(api_version) for api_version in (None, *PROXY_TYPE_MAPPING.values())))
+
+        duration = time.perf_counter() - started
+        refresh_duration.observe(duration, kind="countries")
+        logger.info(f"[CATALOG] Countries refreshed for {len(self.countries)} versions in {duration:.2f}s")
+        return self.countries
+
+    async def refresh_availability(self):
+        if not self.countries:
+            await self.refresh_countries()
+
+        started = time.perf_counter()
+        ttl = self._ttl(settings.CATALOG_AVAILABILITY_INTERVAL, settings.CATALOG_AVAILABILITY_TTL)
+        pairs = [
+            (api_version, country)
+            for api_version, countries in self.countries.items()
+            for country in countries
+        ]
+
+        await asyncio.gather(*(
+            self._guarded(
+                "availability", (api_version, country),
+                lambda api_version=api_version, country=country: self.catalog.refresh_availability(
+                    api_version, country, ttl=ttl),
+            )
+            for api_version, country in pairs
+        ))
+
+        duration = time.perf_counter() - started
+        refresh_duration.observe(duration, kind="availability")
+        logger.info(f"[CATALOG] Availability refreshed for {len(pairs)} pairs in {duration:.2f}s")
+
+    async def _loop(self, interval: int, refresh_fn):
+        while True:
+            try:
+                await refresh_fn()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[CATALOG] Refresh cycle failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def start(self):
+        self._tasks = [
+            asyncio.create_task(self._loop(settings.CATALOG_COUNTRIES_INTERVAL, self.refresh_countries)),
+            asyncio.create_task(self._loop(settings.CATALOG_AVAILABILITY_INTERVAL, self.refresh_availability)),
+        ]
+        logger.info("[CATALOG] Warmer started")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("[CATALOG] Warmer stopped")
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import os
+import time
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def sweep_export_dir(directory: str, max_age: int, max_bytes: int) -> tuple[int, int]:
+    """
+    Удаляет файлы старше max_age, затем самые давние по mtime, пока каталог больше max_bytes.
+    Возвращает (удалено файлов, освобождено байт).
+    *.tmp - выгрузки, которые ещё пишутся (FileExporter.export_artifact): в объём не входят
+    и удаляются только по max_age, когда запись явно оборвалась.
+    """
+    now = time.time()
+    files = []
+    removed = freed = 0
+    for entry in os.scandir(directory):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        if entry.name.endswith(".tmp"):
+            if now - stat.st_mtime > max_age and _remove(entry.path):
+                removed += 1
+                freed += stat.st_size
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+    files.sort()
+
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+class ExportSweeper:
+    """
+    Фоновая очистка EXPORT_DIR: срок жизни EXPORT_MAX_AGE и общий объём EXPORT_MAX_BYTES.
+    Файл, отданный из кэша, получает свежий mtime и удаляется последним.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory or settings.EXPORT_DIR
+        self._task: asyncio.Task | None = None
+
+    async def sweep(self) -> int:
+        removed, freed = await asyncio.to_thread(
+            sweep_export_dir, self.directory, settings.EXPORT_MAX_AGE, settings.EXPORT_MAX_BYTES)
+        if removed:
+            logger.info(f"[EXPORT] Removed {removed} export files, freed {freed / 1024 / 1024:.1f} MB")
+        return removed
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"[EXPORT] Sweep failed: {e}")
+            await asyncio.sleep(settings.EXPORT_SWEEP_INTERVAL)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._loop())
+        logger.info("[EXPORT] Sweeper started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        logger.info("[EXPORT] Sweeper stopped")
@@ -1,6 +1,7 @@
 import typer
 import asyncio
 from app.services.proxy_service import ProxyService
+from app.core.config import settings
 from app.core.db import get_async_session
 from datetime import datetime, timezone
 from app.core.logging_config import setup_logging
@@ -16,7 +17,7 @@ logger.propagate = True
 
 
 @app.command()
-def deactivate():
+def deactivate(batch_size: int = typer.Option(settings.PROXY_EXPIRATION_BATCH_SIZE, help="Rows per UPDATE")):
     """Deactivate expired proxies"""
     print("=== LOGGING DEBUG ===")
     print(logging.getLogger().handlers)
@@ -32,16 +33,14 @@ def deactivate():
             logger.info(f"[CRON] Start check at {now.isoformat()}")
             print(f"[CRON] Start check at {now.isoformat()}")
 
-            expiring = await proxy_service.get_active_proxy_by_date(now)
-            if not expiring:
+            total = await proxy_service.deactivate_expired_proxies(now, batch_size)
+            if not total:
                 logger.info("[CRON] No proxies found")
                 print("[CRON] No proxies found")
                 return
 
-            for p in expiring:
-                logger.info(f"[EXPIRED] {p.ip}:{p.port} ends at {p.date_end}")
-                print(f"[EXPIRED] {p.ip}:{p.port} ends at {p.date_end}")
-            await proxy_service.deactivate_proxy_list(expiring)
+            logger.info(f"[CRON] Deactivated {total} expired proxies")
+            print(f"[CRON] Deactivated {total} expired proxies")
         finally:
             await session_gen.aclose()
     asyncio.run(run())
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.metrics import metrics
+from app.orchestrators.proxy import BuyProxyOrchestrator
+from app.schemas.proxy import ProxyBuyRequest
+from app.services import TransactionService, UserService
+
+logger = logging.getLogger(__name__)
+proxy_critical_logger = logging.getLogger("proxy_critical")
+
+job_duration = metrics.histogram(
+    "purchase_job_duration_seconds",
+    "Time from claiming a purchase job to its completion",
+    ("outcome",),
+)
+jobs_total = metrics.counter(
+    "purchase_jobs_total",
+    "Processed purchase jobs",
+    ("outcome",),
+)
+queue_depth = metrics.gauge(
+    "purchase_queue_depth",
+    "Purchase jobs waiting for a worker",
+)
+
+
+class PurchaseWorker:
+    """
+    Пул воркеров фоновых покупок. Очередь в памяти - только ускоритель:
+    источник истины - транзакции в статусе pending, при старте они подхватываются заново.
+    """
+
+    def __init__(self, concurrency: int | None = None, session_factory=async_session):
+        self.concurrency = concurrency or settings.PURCHASE_WORKERS
+        self.session_factory = session_factory
+        self.queue: asyncio.Queue[int | None] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        # задания между claim_purchase и завершением: при отмене на остановке уходят в review
+        self._in_flight: set[int] = set()
+        self._stale_task: asyncio.Task | None = None
+        self._stop_sweep = asyncio.Event()
+        queue_depth.set_function(lambda: self.queue.qsize())
+
+    def submit(self, transaction_id: int):
+        self.queue.put_nowait(transaction_id)
+
+    @staticmethod
+    def _report_review(transaction_ids: list[int]):
+        for transaction_id in transaction_ids:
+            proxy_critical_logger.error(
+                f"[PURCHASE REVIEW] Transaction {transaction_id} was interrupted during the upstream buy, "
+                f"check the vendor order and settle it manually"
+            )
+
+    async def flag_stale(self) -> list[int]:
+        """
+        processing дольше PURCHASE_STALE_SECONDS -> review. Свои задания в работе не трогаем:
+        зависшими считаются только покупки, брошенные упавшим процессом (этим или другим экземпляром).
+        """
+        async with self.session_factory() as session:
+            older_than = datetime.now(timezone.utc) - timedelta(seconds=settings.PURCHASE_STALE_SECONDS)
+            flagged = await TransactionService(session).flag_stale_purchases(older_than, exclude=self._in_flight)
+        self._report_review(flagged)
+        return flagged
+
+    async def recover(self):
+        await self.flag_stale()
+        async with self.session_factory() as session:
+            pending = await TransactionService(session).get_pending_purchase_ids()
+
+        for transaction_id in pending:
+            self.submit(transaction_id)
+        if pending:
+            logger.info(f"[PURCHASE] Recovered {len(pending)} pending purchase jobs")
+
+    async def process(self, transaction_id: int) -> str:
+        started = time.monotonic()
+        outcome = "skipped"
+        async with self.session_factory() as session:
+            transaction = await TransactionService(session).claim_purchase(transaction_id)
+            if transaction is None:
+                # уже обработана другим воркером или экземпляром
+                return outcome
+
+            self._in_flight.add(transaction_id)
+            try:
+                request = ProxyBuyRequest(**transaction.request_data)
+                user = await UserService(session).get_user_by_id(transaction.user_id, with_balance=False)
+                result = await BuyProxyOrchestrator(session).complete(
+                    transaction.id, user, transaction.amount, request)
+                outcome = "completed" if getattr(result, "success", False) else "failed"
+            except Exception as e:
+                outcome = "review"
+                proxy_critical_logger.error(f"[PURCHASE REVIEW] Job {transaction_id} crashed: {e!r}")
+                await session.rollback()
+                await TransactionService(session).update_status(
+                    transaction_id, "review", f"Purchase job crashed: {e}")
+            finally:
+                self._in_flight.discard(transaction_id)
+
+        jobs_total.inc(outcome=outcome)
+        job_duration.observe(time.monotonic() - started, outcome=outcome)
+        return outcome
+
+    async def _loop(self):
+        while True:
+            transaction_id = await self.queue.get()
+            if transaction_id is None:
+                return
+            try:
+                await self.process(transaction_id)
+            except Exception as e:
+                logger.exception(f"[PURCHASE] Job {transaction_id} failed: {e}")
+
+    async def _stale_loop(self):
+        # процесс мог упасть и перезапуститься раньше, чем его покупки стали "старыми" для recover
+        while True:
+            try:
+                await asyncio.wait_for(self._stop_sweep.wait(), timeout=settings.PURCHASE_STALE_SECONDS)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flag_stale()
+            except Exception as e:
+                logger.exception(f"[PURCHASE] Stale purchase sweep failed: {e}")
+
+    async def start(self):
+        await self.recover()
+        self._tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+        self._stop_sweep.clear()
+        self._stale_task = asyncio.create_task(self._stale_loop())
+        logger.info(f"[PURCHASE] Started {self.concurrency} purchase workers")
+
+    async def stop(self):
+        # Задания из очереди остаются pending в БД и будут подхвачены при следующем старте
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        if self._stale_task:
+            # текущая проверка дорабатывает, следующая не начинается
+            self._stop_sweep.set()
+            await asyncio.gather(self._stale_task, return_exceptions=True)
+            self._stale_task = None
+        if not self._tasks:
+            return
+        for _ in self._tasks:
+            self.queue.put_nowait(None)
+
+        _, running = await asyncio.wait(self._tasks, timeout=settings.PURCHASE_SHUTDOWN_TIMEOUT)
+        # снимок до отмены: processing после отмены не вернётся в pending и не дождётся recover
+        interrupted = list(self._in_flight)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        if running:
+            logger.warning(f"[PURCHASE] {len(running)} purchase jobs interrupted on shutdown")
+        if interrupted:
+            async with self.session_factory() as session:
+                self._report_review(await TransactionService(session).flag_interrupted_purchases(interrupted))
+            self._in_flight.clear()
+        self._tasks = []
+        logger.info("[PURCHASE] Purchase workers stopped")
+
+
+purchase_worker = PurchaseWorker()
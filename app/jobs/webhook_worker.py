@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from app.core.config import settings
+from app.core.db import async_session
+from app.core.metrics import metrics
+from app.orchestrators.webhook_orchestrator import WebhookOrchestrator
+from app.services import WebhookEventService
+
+logger = logging.getLogger(__name__)
+
+event_duration = metrics.histogram(
+    "webhook_event_duration_seconds",
+    "Time to apply a stored webhook event",
+    ("outcome",),
+)
+events_total = metrics.counter(
+    "webhook_events_total",
+    "Processed webhook events",
+    ("outcome",),
+)
+
+
+class WebhookWorker:
+    """
+    Пул воркеров inbox webhook_events. Каждое событие применяется в одной транзакции БД
+    вместе с отметкой processed: после падения процесса оно просто остаётся pending.
+    """
+
+    def __init__(self, concurrency: int | None = None, session_factory=async_session):
+        self.concurrency = concurrency or settings.WEBHOOK_WORKERS
+        self.session_factory = session_factory
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: list[asyncio.Task] = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def process_next(self) -> str | None:
+        """
+        Обрабатывает одно событие. None - очередь пуста (или все события заняты другими воркерами).
+        """
+        started = time.monotonic()
+        async with self.session_factory() as session:
+            event_service = WebhookEventService(session)
+            event = await event_service.claim_next()
+            if event is None:
+                return None
+
+            event_id = event.id
+            try:
+                # откат только до savepoint: блокировка события держится до коммита отметки о сбое,
+                # другой воркер не заберёт его, пока попытка не засчитана
+                async with session.begin_nested():
+                    result = await WebhookOrchestrator(session, unit_of_work=True).execute(event.payload)
+            except Exception as e:
+                logger.exception(f"[WEBHOOK] Event {event_id} failed: {e}")
+                state = await event_service.record_failure(event_id, repr(e))
+                outcome = "retry" if state == "pending" else "failed"
+                if outcome == "failed":
+                    logger.error(f"[WEBHOOK] Event {event_id} gave up after {settings.WEBHOOK_MAX_ATTEMPTS} attempts")
+            else:
+                await event_service.mark_processed(event, result)
+                await session.commit()
+                outcome = result.get("status", "error")
+
+        events_total.inc(outcome=outcome)
+        event_duration.observe(time.monotonic() - started, outcome=outcome)
+        return outcome
+
+    async def _loop(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                outcome = await self.process_next()
+            except Exception as e:
+                logger.exception(f"[WEBHOOK] Inbox poll failed: {e}")
+                outcome = None
+
+            if outcome is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.WEBHOOK_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+            elif outcome == "retry":
+                # не крутим одно и то же падающее событие без паузы
+                await asyncio.sleep(settings.WEBHOOK_POLL_INTERVAL)
+
+    async def start(self):
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+        logger.info(f"[WEBHOOK] Started {self.concurrency} webhook workers")
+
+    async def stop(self):
+        if not self._tasks:
+            return
+        # Текущие события дорабатываются, необработанные остаются pending в БД
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("[WEBHOOK] Webhook workers stopped")
+
+
+webhook_worker = WebhookWorker()
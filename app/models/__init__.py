@@ -4,3 +4,4 @@ from .user import User
 from .proxy import Proxy
 from .balance import Balance
 from .transaction import Transaction
+from .webhook_event import WebhookEvent
@@ -8,7 +8,7 @@ class Balance(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    owner: Mapped["User"] = relationship("User", back_populates="balance", lazy="selectin")
+    owner: Mapped["User"] = relationship("User", back_populates="balance", lazy="raise")
     amount: Mapped[float] = mapped_column(Float, default=0.0)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
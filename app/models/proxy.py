@@ -1,15 +1,31 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy import String, Integer, Boolean, DateTime, ForeignKey, Index, text
 from datetime import datetime, timezone
 from app.core.sync_db import Base
 from sqlalchemy.orm import relationship
 
 class Proxy(Base):
     __tablename__ = "proxy"
+    __table_args__ = (
+        # списки и batch-проверки пользователя: index-only scan по (user_id) с host/port/proxy_id
+        Index(
+            "ix_proxy_user_id_active", "user_id",
+            postgresql_include=["host", "port", "proxy_id"],
+            postgresql_where=text("active"),
+        ),
+        # джоба истечения: active AND date_end < now
+        Index("ix_proxy_active_date_end", "date_end", postgresql_where=text("active")),
+        # проверка по адресу: host, port + владелец
+        Index(
+            "ix_proxy_host_port", "host", "port",
+            postgresql_include=["user_id"],
+            postgresql_where=text("active"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    owner: Mapped["User"] = relationship("User", back_populates="proxies", lazy="selectin")
+    owner: Mapped["User"] = relationship("User", back_populates="proxies", lazy="raise")
     proxy_id: Mapped[str] = mapped_column(String, nullable=False)
     ip: Mapped[str] = mapped_column(String, nullable=False)
     version: Mapped[int] = mapped_column(Integer, nullable=True)
@@ -24,3 +40,6 @@ class Proxy(Base):
     unixtime_end: Mapped[int] = mapped_column(Integer, nullable=True)
     descr: Mapped[str] = mapped_column(String, nullable=True)
     active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # авторизация на прокси (user/pass из ответа поставщика)
+    login: Mapped[str] = mapped_column(String, nullable=True)
+    password: Mapped[str] = mapped_column(String, nullable=True)
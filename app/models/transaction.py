@@ -1,15 +1,19 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, ForeignKey, DateTime, Float, String, Text
+from sqlalchemy import Integer, ForeignKey, DateTime, Float, String, Text, Index, JSON
 from datetime import datetime, timezone
 from app.core.sync_db import Base
 
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("uq_transactions_external_id", "external_id", unique=True),
+        Index("uq_transactions_user_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
-    owner: Mapped["User"] = relationship("User", back_populates="transactions", lazy="selectin")
+    owner: Mapped["User"] = relationship("User", back_populates="transactions", lazy="raise")
     
     amount: Mapped[float] = mapped_column(Float, nullable=False)
     balance_after: Mapped[float] = mapped_column(Float, nullable=False)
@@ -22,6 +26,12 @@ class Transaction(Base):
     status: Mapped[str] = mapped_column(String(50), nullable=False)
     external_id: Mapped[str] = mapped_column(String(100), nullable=True)
 
+    # Покупка прокси: параметры запроса (для восстановления фоновых заданий) и итоговый ответ
+    request_data: Mapped[dict] = mapped_column(JSON, nullable=True)
+    response_data: Mapped[dict] = mapped_column(JSON, nullable=True)
+    # Заголовок Idempotency-Key: повтор запроса с тем же ключом получает сохранённый response_data
+    idempotency_key: Mapped[str] = mapped_column(String(100), nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.now(timezone.utc)
     )
@@ -27,11 +27,11 @@ class User(Base):
         onupdate=datetime.now(timezone.utc)
         )
     proxies: Mapped[List["Proxy"]] = relationship(
-        "Proxy", back_populates="owner", lazy="selectin"
+        "Proxy", back_populates="owner", lazy="raise"
         )
     balance: Mapped[Optional["Balance"]] = relationship(
-        "Balance", back_populates="owner", uselist=False, cascade="all, delete-orphan", lazy="selectin"
+        "Balance", back_populates="owner", uselist=False, cascade="all, delete-orphan", lazy="raise"
         )
     transactions: Mapped[List["Transaction"]] = relationship(
-        "Transaction", back_populates="owner", lazy="selectin"
+        "Transaction", back_populates="owner", lazy="raise"
         )
\ No newline at end of file
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, DateTime, String, Text, Index, JSON, text
+from datetime import datetime, timezone
+from app.core.sync_db import Base
+
+
+class WebhookEvent(Base):
+    """
+    Входящий колбек платёжного провайдера. Эндпоинт только сохраняет событие,
+    обрабатывают его фоновые воркеры (app/jobs/webhook_worker.py).
+    """
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        # повторная доставка того же колбека не создаёт второе событие
+        Index("uq_webhook_events_provider_invoice_status", "provider", "invoice_id", "status", unique=True),
+        Index("ix_webhook_events_pending", "id", postgresql_where=text("state = 'pending'")),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    provider: Mapped[str] = mapped_column(String(50), nullable=False)
+    invoice_id: Mapped[str] = mapped_column(String(100), nullable=False)
+    status: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    # pending -> processed | failed
+    state: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    processed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
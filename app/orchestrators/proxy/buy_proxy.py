@@ -1,27 +1,85 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.proxy import ProxyBuyRequest, ProxyBuyResponse
+from app.schemas.proxy import ProxyBuyRequest, ProxyBuyResponse, proxy_item_list_adapter
 from app.services import ProxyApiService, BalanceService, TransactionService, ProxyService, UserService
+from app.core.config import settings
+from app.models.user import User
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class BuyProxyOrchestrator:
-    def __init__(self, session: AsyncSession):
+    """
+    unit_of_work=True: списание и pending-транзакция фиксируются одним коммитом до запроса к поставщику,
+    сохранение прокси и завершение транзакции (или возврат средств) - вторым.
+    Во время запроса к поставщику транзакция БД не держится.
+    unit_of_work=False - прежний режим с коммитом на каждом шаге (для сравнения в scripts/bench_buy_flow.py).
+    """
+
+    def __init__(self, session: AsyncSession, unit_of_work: bool = True):
         self.session = session
+        self.unit_of_work = unit_of_work
+        autocommit = not unit_of_work
         self.user_service = UserService(self.session)
         self.proxy_api = ProxyApiService(self.session)
-        self.balance_service = BalanceService(self.session)
-        self.transaction_service = TransactionService(self.session)
-        self.proxy_service = ProxyService(self.session)
+        self.balance_service = BalanceService(self.session, autocommit=autocommit)
+        self.transaction_service = TransactionService(self.session, autocommit=autocommit)
+        self.proxy_service = ProxyService(self.session, autocommit=autocommit)
+
+    async def execute(self, request: ProxyBuyRequest, idempotency_key: str | None = None):
+        # Синхронный режим: транзакция сразу в processing, фоновые воркеры её не подхватят
+        reservation = await self.reserve(request, status="processing", idempotency_key=idempotency_key)
+        if not reservation["success"]:
+            return reservation
+        if reservation.get("replayed"):
+            return await self.transaction_service.wait_for_response(reservation["transaction_id"])
+        return await self.complete(reservation["transaction_id"], reservation["user"], reservation["price"], request)
+
+    async def _find_replay(self, request: ProxyBuyRequest, idempotency_key: str) -> dict | None:
+        user = await self.user_service.get_user_by_telegram_id(request.telegram_id, with_balance=False)
+        if not user:
+            return None
+
+        transaction = await self.transaction_service.get_by_idempotency_key(user.id, idempotency_key)
+        if not transaction:
+            return None
+        if transaction.type != "proxy" or transaction.request_data != request.model_dump():
+            return {
+                "success": False,
+                "status_code": 422,
+                "error": "Idempotency-Key was already used with different parameters"
+            }
 
-    async def execute(self, request: ProxyBuyRequest):
+        logger.info(f"[BUY REPLAY] Idempotency-Key matches transaction ID={transaction.id} ({transaction.status})")
+        return {
+            "success": True,
+            "status_code": 200,
+            "error": "",
+            "transaction_id": transaction.id,
+            "price": transaction.amount,
+            "status": transaction.status,
+            "user": user,
+            "replayed": True
+        }
+
+    async def reserve(self, request: ProxyBuyRequest, status: str = "pending",
+                      idempotency_key: str | None = None) -> dict:
+        """
+        Получает цену, списывает средства и создаёт транзакцию покупки с параметрами запроса.
+        С idempotency_key повторный запрос не повторяет работу, а получает уже созданную транзакцию (replayed).
+        """
         logger.info(
             f"[BUY START] Request received from telegram_id={request.telegram_id} for {request.quantity} proxies ({request.version}/{request.type}) for {request.days} days in {request.country}")
 
-        # Getting actual price for proxy
+        if idempotency_key:
+            replay = await self._find_replay(request, idempotency_key)
+            if replay:
+                return replay
+
+        # Getting actual price for proxy (cached quote is accepted only if fresh enough)
         data_price = await self.proxy_api.get_proxy_price(request.version, request.quantity,
-                                                          request.days, request.telegram_id)
+                                                          request.days, request.telegram_id,
+                                                          max_age=settings.PRICE_BUY_MAX_AGE)
         if not data_price['success']:
             logger.warning(f"[PRICE FAILED] Could not get price: {data_price.get('error')}")
             return data_price
@@ -29,9 +87,9 @@ class BuyProxyOrchestrator:
         price = data_price["total_price"]
         logger.info(f"[PRICE OK] Total price calculated: {price}")
 
-        # Getting current user
-        user = await self.user_service.get_user_by_telegram_id(request.telegram_id)
-        if not user or not user.balance:
+        # Getting current user (balance is checked and debited atomically below)
+        user = await self.user_service.get_user_by_telegram_id(request.telegram_id, with_balance=False)
+        if not user:
             logger.warning(f"[USER FAILED] User or balance not found for telegram_id={request.telegram_id}")
             return {
                 "success": False,
@@ -39,36 +97,52 @@ class BuyProxyOrchestrator:
                 "error": "User or balance not found"
             }
 
-        logger.info(f"[USER OK] User ID: {user.id}, Current balance: {user.balance.amount}")
+        logger.info(f"[USER OK] User ID: {user.id}")
 
-        # Checking users balance for price
-        have_money = await self.balance_service.check_balance(user, price)
-        if not have_money["success"]:
-            logger.warning(f"[BALANCE CHECK FAILED] {have_money.get('error')}")
-            return have_money
+        # Subtract money: succeeds only if the balance covers the price
+        subtract_money = await self.balance_service.subtract_money(user, price)
+        if not subtract_money["success"]:
+            logger.warning(f"[SUBTRACT FAILED] {subtract_money.get('error')}")
+            return subtract_money
 
-        logger.info(f"[BALANCE OK] User has enough balance")
+        new_balance = subtract_money["new_balance"]
+        logger.info(f"[SUBTRACT OK] {price} deducted from user ID={user.id}, new_balance={new_balance}")
 
         # Create first step of Transaction
-        new_balance = self.balance_service.check_minus_balance(user, price)
-        transaction_status = await self.transaction_service.create_wait_proxy_transaction(user, price, new_balance)
+        transaction_status = await self.transaction_service.create_wait_proxy_transaction(
+            user, price, new_balance, request_data=request.model_dump(), status=status,
+            idempotency_key=idempotency_key)
         if not transaction_status["success"]:
             logger.error(
                 f"[TRANSACTION FAILED] Could not create pending transaction: {transaction_status.get('error')}")
+            if self.unit_of_work:
+                await self.session.rollback()
+            else:
+                await self.balance_service.add_money(user, price)
+            # Параллельный запрос с тем же ключом успел раньше - отдаём его транзакцию
+            if transaction_status["status_code"] == 409 and idempotency_key:
+                return await self._find_replay(request, idempotency_key) or transaction_status
             return transaction_status
 
+        # Reserve: debit + pending transaction
+        await self.session.commit()
         transaction_id = transaction_status["transaction_id"]
         logger.info(f"[TRANSACTION CREATED] ID={transaction_id}, amount={price}, new_balance={new_balance}")
 
-        # Subtract money
-        subtract_money = await self.balance_service.subtract_money(user, price)
-        if not subtract_money["success"]:
-            await self.transaction_service.update_status(transaction_id, "failed", subtract_money["error"])
-            logger.error(f"[SUBTRACT FAILED] {subtract_money.get('error')}")
-            return subtract_money
-
-        logger.info(f"[SUBTRACT OK] {price} deducted from user ID={user.id}")
-
+        return {
+            "success": True,
+            "status_code": 200,
+            "error": "",
+            "transaction_id": transaction_id,
+            "price": price,
+            "status": status,
+            "user": user
+        }
+
+    async def complete(self, transaction_id: int, user: User, price: float, request: ProxyBuyRequest):
+        """
+        Покупка у поставщика по зарезервированной транзакции: сохранение прокси или возврат средств.
+        """
         # Send request to the api
         buying_status = await self.proxy_api.buy_proxy(
             request.version, request.quantity,
@@ -78,12 +152,19 @@ class BuyProxyOrchestrator:
         if not buying_status["success"] or not buying_status["data"]:
             comment = "Purchase failed: " + buying_status.get("error", "Unknown")
             logger.error(f"[BUYING FAILED] {comment}")
-            await self.transaction_service.update_status(transaction_id, "failed", comment)
+            await self.transaction_service.update_status(transaction_id, "failed", comment,
+                                                         response_data=buying_status)
 
             # Returning money
-            new_balance = self.balance_service.check_plus_balance(user, price)
-            transaction_refund = await self.transaction_service.create_refund_transaction(user, price, new_balance, str(transaction_id))
-            await self.balance_service.add_money(user, price)
+            refund = await self.balance_service.add_money(user, price)
+            if not refund["success"]:
+                await self.session.commit()
+                logger.error(f"[REFUND FAILED] Could not return {price} to user ID={user.id}: {refund.get('error')}")
+                return buying_status
+
+            new_balance = refund["new_balance"]
+            await self.transaction_service.create_refund_transaction(user, price, new_balance, str(transaction_id))
+            await self.session.commit()
 
             logger.info(f"[REFUND] Returned {price} to user ID={user.id}, balance restored to {new_balance}")
             return buying_status
@@ -94,12 +175,7 @@ class BuyProxyOrchestrator:
         result = await self.proxy_service.create_list_proxy(user, transaction_id, buying_status["data"])
         logger.info(f"[SAVE OK] proxies saved to DB for user ID={user.id}")
 
-        # Update Transaction status
-        comment = "Purchase complete"
-        await self.transaction_service.update_status(transaction_id, "completed", comment)
-        logger.info(f"[TRANSACTION COMPLETED] ID={transaction_id}")
-
-        proxy_dicts = [self.proxy_service.to_proxy_item_response(p).model_dump() for p in result["proxies"]]
+        proxy_items = proxy_item_list_adapter.validate_python(result["proxies"], from_attributes=True)
 
         result = ProxyBuyResponse(
             success=True,
@@ -109,6 +185,14 @@ class BuyProxyOrchestrator:
             price=price,
             days=result["days"],
             country=result["country"],
-            proxies=proxy_dicts
+            proxies=proxy_items
         )
+
+        # Update Transaction status
+        comment = "Purchase complete"
+        await self.transaction_service.update_status(transaction_id, "completed", comment,
+                                                     response_data=result.model_dump(mode="json"))
+        await self.session.commit()
+        logger.info(f"[TRANSACTION COMPLETED] ID={transaction_id}")
+
         return result
@@ -15,7 +15,22 @@ class TopUpOrchestrator:
         self.transaction_service = TransactionService(self.session)
         self.balance_service = BalanceService(session)
 
-    async def execute(self, telegram_id: str, provider_key: str, amount: float):
+    async def _replay(self, user, amount: float, idempotency_key: str) -> dict | None:
+        transaction = await self.transaction_service.get_by_idempotency_key(user.id, idempotency_key)
+        if not transaction:
+            return None
+        if transaction.type != "topup" or transaction.amount != amount:
+            return {
+                "success": False,
+                "status_code": 422,
+                "topup_url": "",
+                "error": "Idempotency-Key was already used with different parameters"
+            }
+
+        logger.info(f"[TOPUP REPLAY] Idempotency-Key matches transaction ID={transaction.id}")
+        return await self.transaction_service.wait_for_response(transaction.id)
+
+    async def execute(self, telegram_id: str, provider_key: str, amount: float, idempotency_key: str | None = None):
         user = await self.user_service.get_user_by_telegram_id(telegram_id)
         if not user or not user.balance:
             logger.warning(f"[USER FAILED] User or balance not found for telegram_id={telegram_id}")
@@ -26,16 +41,24 @@ class TopUpOrchestrator:
                 "error": "User or balance not found"
             }
 
+        if idempotency_key:
+            replay = await self._replay(user, amount, idempotency_key)
+            if replay:
+                return replay
+
         new_balance = self.balance_service.check_plus_balance(user, amount)
         strategy = TopUpStrategyFactory.get_strategy(provider_key)
         provider_name = strategy.get_name()
 
         transaction_status = await self.transaction_service.create_wait_top_up_transaction(
-            user, amount, new_balance, provider_name)
+            user, amount, new_balance, provider_name, idempotency_key=idempotency_key)
 
         if not transaction_status["success"]:
             logger.error(
                 f"[TRANSACTION FAILED] Could not create pending transaction: {transaction_status.get('error')}")
+            # Параллельный запрос с тем же ключом успел раньше - ждём его ссылку
+            if transaction_status["status_code"] == 409 and idempotency_key:
+                return await self._replay(user, amount, idempotency_key) or transaction_status
             return transaction_status
 
         transaction_id = transaction_status["transaction_id"]
@@ -43,15 +66,18 @@ class TopUpOrchestrator:
 
         response = await strategy.generate_link(user, amount, transaction_id)
 
-        if not response['success']:
-            await self.transaction_service.update_status(transaction_id, "failed", response['error'])
-            logger.error(f"[TRANSACTION FAILED] Could not create pending transaction: {response['error']}")
-
-        await self.transaction_service.update_external_id(transaction_id, response['invoice_id'])
-
-        return {
+        result = {
             "success": response['success'],
             "status_code": 200,
             "topup_url": response['link'],
             "error": response['error']
         }
+
+        if not response['success']:
+            await self.transaction_service.update_status(transaction_id, "failed", response['error'],
+                                                         response_data=result)
+            logger.error(f"[TRANSACTION FAILED] Could not create pending transaction: {response['error']}")
+
+        await self.transaction_service.update_external_id(transaction_id, response['invoice_id'], response_data=result)
+
+        return result
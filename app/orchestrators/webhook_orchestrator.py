@@ -8,15 +8,24 @@ logger = logging.getLogger(__name__)
 
 
 class WebhookOrchestrator:
-    def __init__(self, session: AsyncSession):
+    """
+    unit_of_work=True: изменения только отправляются в БД, коммитит вызывающий код (воркер inbox -
+    вместе с отметкой события). Строка транзакции блокируется до коммита, поэтому события
+    одного invoice_id применяются строго по очереди.
+    """
+
+    def __init__(self, session: AsyncSession, unit_of_work: bool = False):
         self.session = session
+        self.unit_of_work = unit_of_work
+        autocommit = not unit_of_work
         self.user_service = UserService(session)
-        self.balance_service = BalanceService(session)
-        self.transaction_service = TransactionService(session)
+        self.balance_service = BalanceService(session, autocommit=autocommit)
+        self.transaction_service = TransactionService(session, autocommit=autocommit)
 
     async def execute(self, data: dict):
         external_id = data["invoice_id"]
-        transaction = await self.transaction_service.get_transaction_by_external_id(str(external_id))
+        transaction = await self.transaction_service.get_transaction_by_external_id(
+            str(external_id), for_update=self.unit_of_work)
         if not transaction:
             logger.error(
                 f"[TRANSACTION FAILED] Could not found transaction by external_id: {external_id}")
@@ -47,7 +56,7 @@ class WebhookOrchestrator:
             return {"status": "error"}
 
         user_id = transaction.user_id
-        user = await self.user_service.get_user_by_id(user_id)
+        user = await self.user_service.get_user_by_id(user_id, with_balance=False)
 
         if not user:
             logger.error(
@@ -61,6 +70,7 @@ class WebhookOrchestrator:
                 transaction.id, "failed", "Top Up successful but we can't add money")
         else:
             await self.transaction_service.update_status(
-                transaction.id, "success", "Top Up successful. New balance: " + str(result_money["new_balance"]))
+                transaction.id, "success", "Top Up successful. New balance: " + str(result_money["new_balance"]),
+                balance_after=result_money["new_balance"])
 
         return {"status": "ok"}
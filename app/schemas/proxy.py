@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, field_validator
 from typing import List, Optional
 from datetime import datetime
+from app.core.constants import REVERSE_PROXY_TYPE_MAPPING
 
 
 class ProxyBuyRequest(BaseModel):
@@ -45,6 +46,25 @@ class ProxyItemResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+    @field_validator("version", mode="before")
+    @classmethod
+    def version_name(cls, value):
+        # в БД и у поставщика версия - число (4), в ответе - имя (ipv4)
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return REVERSE_PROXY_TYPE_MAPPING.get(str(value), "unknown")
+        return value
+
+
+class ProxyListResponse(BaseModel):
+    success: bool
+    status_code: int
+    error: str
+    proxies: List[ProxyItemResponse]
+
+
+# Собирается один раз при импорте: список ORM-объектов или ProxyItem -> ProxyItemResponse за один вызов
+proxy_item_list_adapter = TypeAdapter(List[ProxyItemResponse])
+
 
 class ProxyBuyResponse(BaseModel):
     success: bool
@@ -73,6 +93,8 @@ class ProxyItemDB(BaseModel):
     unixtime_end: int
     descr: str
     active: bool
+    login: Optional[str] = None
+    password: Optional[str] = None
 
 
 class ProxyGetRequest(BaseModel):
@@ -84,6 +106,11 @@ class ProxyCheckRequest(BaseModel):
     address: str
 
 
+class ProxyBatchCheckRequest(BaseModel):
+    telegram_id: str
+    addresses: Optional[List[str]] = None  # None - все активные прокси пользователя
+
+
 class ProxyLinkRequest(BaseModel):
     telegram_id: str
     file_type: str
\ No newline at end of file
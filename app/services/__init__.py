@@ -4,3 +4,5 @@ from .transaction_service import TransactionService
 from .user_service import UserService
 from .proxy_service import ProxyService
 from .file_exporter import FileExporter
+from .catalog_service import CatalogService
+from .webhook_event_service import WebhookEventService
@@ -1,10 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from app.models.balance import Balance
 from app.models.user import User
 
 
 class BalanceService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
+        # autocommit=False: изменения только отправляются в БД (flush), коммитит вызывающий код (unit of work)
         self.session = session
+        self.autocommit = autocommit
+
+    async def _commit(self):
+        if self.autocommit:
+            await self.session.commit()
+        else:
+            await self.session.flush()
 
     async def get_balance(self, user: User):
         if not user or not user.balance:
@@ -43,53 +53,83 @@ class BalanceService:
             "error": ""
         }
 
-    def check_minus_balance(self, user: User, new_amount: float):
-        balance = user.balance.amount
-        return balance - new_amount
-
     def check_plus_balance(self, user: User, new_amount: float):
         balance = user.balance.amount
         return balance + new_amount
 
+    async def _balance_not_found_or(self, user_id: int, error: dict) -> dict:
+        # UPDATE не затронул строк: различаем отсутствие баланса и нехватку средств
+        exists = await self.session.scalar(select(Balance.id).where(Balance.user_id == user_id))
+        if exists is None:
+            return {
+                "success": False,
+                "status_code": 404,
+                "error": "User or balance not found"
+            }
+        return error
+
     async def add_money(self, user: User, amount: float):
-        if not user or not user.balance:
+        """
+        Атомарное зачисление одним UPDATE ... RETURNING, без чтения баланса в Python.
+        new_balance - баланс сразу после этой операции.
+        """
+        if not user:
             return {
                 "success": False,
                 "status_code": 404,
                 "error": "User or balance not found"
             }
 
-        balance = user.balance
-        balance.amount += amount
-        await self.session.commit()
+        stmt = (
+            update(Balance)
+            .where(Balance.user_id == user.id)
+            .values(amount=Balance.amount + amount)
+            .returning(Balance.amount)
+        )
+        new_balance = await self.session.scalar(stmt)
+        if new_balance is None:
+            return {
+                "success": False,
+                "status_code": 404,
+                "error": "User or balance not found"
+            }
+        await self._commit()
 
         return {
             "success": True,
             "status_code": 200,
-            "new_balance": balance.amount
+            "new_balance": new_balance
         }
 
     async def subtract_money(self, user: User, amount: float):
-        if not user or not user.balance:
+        """
+        Атомарное списание: UPDATE проходит только если amount >= списываемой суммы,
+        поэтому параллельные покупки одного пользователя не уводят баланс в минус.
+        """
+        if not user:
             return {
                 "success": False,
                 "status_code": 404,
                 "error": "User or balance not found"
             }
-        balance = user.balance
 
-        if balance.amount < amount:
-            return {
+        stmt = (
+            update(Balance)
+            .where(Balance.user_id == user.id, Balance.amount >= amount)
+            .values(amount=Balance.amount - amount)
+            .returning(Balance.amount)
+        )
+        new_balance = await self.session.scalar(stmt)
+        if new_balance is None:
+            return await self._balance_not_found_or(user.id, {
                 "success": False,
                 "status_code": 4001,
                 "error": "Insufficient balance"
-            }
-
-        balance.amount -= amount
-        await self.session.commit()
+            })
+        await self._commit()
 
         return {
             "success": True,
             "status_code": 200,
-            "new_balance": balance.amount
+            "new_balance": new_balance
         }
@@ -0,0 +1,89 @@
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.http_client import ProxyApiClient, proxy_api_client
+from app.core.rate_limiter import RateLimitedError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogService:
+    """
+    Каталог поставщика: список стран (getcountry) и доступное количество (getcount).
+    Эндпоинты читают через кэш, фоновый CatalogWarmer обновляет его через refresh_*.
+    """
+
+    def __init__(self, api_client: ProxyApiClient | None = None):
+        self.api_client = api_client or proxy_api_client
+
+    @staticmethod
+    def countries_key(api_version: str | None) -> str:
+        return f"proxy:countries:{api_version if api_version else 'default'}"
+
+    @staticmethod
+    def availability_key(api_version: str, country: str) -> str:
+        return f"proxy:availability:{api_version}:{country.lower()}"
+
+    @staticmethod
+    def fallback_key(key: str) -> str:
+        return f"{key}:fallback"
+
+    async def _get_fallback(self, key: str, error: RateLimitedError):
+        # Апстрим занят более приоритетными запросами - отдаём последнее известное значение
+        fallback = await cache.get(self.fallback_key(key))
+        if fallback is None:
+            raise error
+        logger.warning(f"Upstream request shed, serving last known value for {key}")
+        return fallback
+
+    async def get_countries(self, api_version: str | None) -> list:
+        key = self.countries_key(api_version)
+        cached = await cache.get(key)
+        # пустой список стран - тоже значение, а не промах
+        if cached is not None:
+            logger.info(f"Cache hit for countries version: {api_version}")
+            return cached
+        try:
+            return await self.refresh_countries(api_version)
+        except RateLimitedError as e:
+            return await self._get_fallback(key, e)
+
+    async def get_availability(self, api_version: str, country: str) -> int:
+        key = self.availability_key(api_version, country)
+        cached = await cache.get(key)
+        if cached is not None:
+            logger.info(f"Cache hit for availability {api_version}:{country}")
+            return int(cached)
+        try:
+            return await self.refresh_availability(api_version, country)
+        except RateLimitedError as e:
+            return int(await self._get_fallback(key, e))
+
+    async def _store(self, key: str, value, ttl: int):
+        await cache.set(key, value, ttl=ttl)
+        await cache.set(self.fallback_key(key), value, ttl=settings.CATALOG_FALLBACK_TTL)
+
+    async def refresh_countries(self, api_version: str | None, ttl: int | None = None) -> list:
+        params = {"version": api_version} if api_version else {}
+        data = await self.api_client.get("getcountry", params)
+
+        if data.get("status") != "yes":
+            raise ValueError(f"Proxy API returned error: {data.get('error')}")
+
+        await self._store(self.countries_key(api_version), data["list"], ttl or settings.CATALOG_COUNTRIES_TTL)
+        return data["list"]
+
+    async def refresh_availability(self, api_version: str, country: str, ttl: int | None = None) -> int:
+        params = {"country": country.lower(), "version": api_version}
+        data = await self.api_client.get("getcount", params)
+
+        if data.get("status") != "yes":
+            raise ValueError(f"Proxy API returned error: {data.get('error')}")
+
+        available_quantity = int(data.get("count", 0))
+        await self._store(
+            self.availability_key(api_version, country),
+            str(available_quantity),
+            ttl or settings.CATALOG_AVAILABILITY_TTL,
+        )
+        return available_quantity
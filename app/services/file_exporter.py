@@ -1,7 +1,21 @@
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+import asyncio
 import csv
+import hashlib
+import hmac
+import io
+import json
+import os
+import shutil
+import uuid
+import zipfile
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
 from typing import List
 from openpyxl import Workbook
+from app.core.config import settings
 from app.models import Proxy
 from app.core.constants import REVERSE_PROXY_TYPE_MAPPING, COUNTRY_TRANSLATIONS
 
@@ -10,35 +24,217 @@ COLUMN_TITLES = {
     "ru": ["Версия", "Ip:Порт", "Тип", "Страна", "Дата окончания"],
 }
 
+# Колонки, нужные для строки экспорта (потоковый экспорт не загружает объекты Proxy целиком)
+EXPORT_COLUMNS = (
+    Proxy.version, Proxy.host, Proxy.port, Proxy.type, Proxy.country, Proxy.date_end, Proxy.login, Proxy.password
+)
+
+# Потоковые форматы: расширение файла и media type
+STREAM_FORMATS = {
+    "csv": ("csv", "text/csv; charset=utf-8"),
+    "txt": ("txt", "text/plain; charset=utf-8"),
+    "txt_auth": ("txt", "text/plain; charset=utf-8"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "zip": ("zip", "application/zip"),
+}
+# Состав архива zip: формат -> имя файла внутри
+BUNDLE_MEMBERS = {
+    "csv": "proxies.csv",
+    "txt_auth": "proxies.txt",
+    "ndjson": "proxies.ndjson",
+}
+
+# Запись файлов выгрузки вне event loop; число одновременных выгрузок ограничено EXPORT_WORKERS
+export_executor = ThreadPoolExecutor(max_workers=settings.EXPORT_WORKERS, thread_name_prefix="export")
+
+
+def proxy_row(proxy, lang: str) -> list:
+    country = COUNTRY_TRANSLATIONS.get(lang, {}).get(proxy.country, proxy.country.upper())
+    return [
+        REVERSE_PROXY_TYPE_MAPPING.get(str(proxy.version), "unknown"),
+        f"{proxy.host}:{proxy.port}",
+        proxy.type,
+        country,
+        proxy.date_end.strftime("%Y-%m-%d %H:%M") if proxy.date_end else ""
+    ]
+
+
+def _csv_chunk(rows, lang: str) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(proxy_row(row, lang))
+    return buffer.getvalue()
+
+
+def _txt_chunk(rows, lang: str) -> str:
+    return "".join(f"{row.host}:{row.port}\n" for row in rows)
+
+
+def _txt_auth_chunk(rows, lang: str) -> str:
+    return "".join(
+        f"{row.host}:{row.port}:{row.login}:{row.password}\n" if row.login else f"{row.host}:{row.port}\n"
+        for row in rows
+    )
+
+
+def _ndjson_chunk(rows, lang: str) -> str:
+    return "".join(
+        json.dumps({
+            "version": REVERSE_PROXY_TYPE_MAPPING.get(str(row.version), "unknown"),
+            "host": row.host,
+            "port": row.port,
+            "type": row.type,
+            "country": row.country,
+            "date_end": row.date_end.isoformat() if row.date_end else None,
+            "login": row.login,
+            "password": row.password,
+        }, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+CHUNK_ENCODERS = {
+    "csv": _csv_chunk,
+    "txt": _txt_chunk,
+    "txt_auth": _txt_auth_chunk,
+    "ndjson": _ndjson_chunk,
+}
+
+
+def _header(file_type: str, lang: str) -> str:
+    if file_type != "csv":
+        return ""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(COLUMN_TITLES.get(lang, COLUMN_TITLES["en"]))
+    return buffer.getvalue()
+
+
 class FileExporter:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    @staticmethod
+    def artifact_name(user_id: int, list_version: str, file_type: str, lang: str) -> str:
+        """
+        Имя файла выгрузки по содержимому: тот же список в том же формате и языке - тот же файл.
+        HMAC на EXPORT_SECRET: /static открыт без токена, имя не должно вычисляться по id пользователя.
+        """
+        key = hmac.new(
+            settings.EXPORT_SECRET.encode(), f"{user_id}:{list_version}:{file_type}:{lang}".encode(), hashlib.sha256
+        ).hexdigest()
+        extension = STREAM_FORMATS[file_type][0] if file_type in STREAM_FORMATS else file_type
+        return f"proxies_{key}.{extension}"
+
+    async def export_artifact(self, filename: str, write: Callable[[str], Awaitable[None]]) -> str:
+        """
+        write(path) пишет файл под временным именем, затем атомарный rename в EXPORT_DIR:
+        параллельные запросы одного и того же файла не видят его недописанным.
+        """
+        filepath = os.path.join(settings.EXPORT_DIR, filename)
+        tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+        try:
+            await write(tmp_path)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return filepath
+
+    async def export_to_file(self, file_type: str, filepath: str, proxies: list, lang: str) -> None:
+        """
+        Пишет файл выгрузки в export_executor. proxies - уже загруженные строки: в потоке нет обращений к БД.
+        """
+        export = self.export_proxies_to_csv if file_type == "csv" else self.export_proxies_to_xls
+        await asyncio.get_running_loop().run_in_executor(export_executor, export, filepath, proxies, lang)
+
+    async def write_stream(self, filepath: str, user_id: int, file_type: str, lang: str) -> None:
+        loop = asyncio.get_running_loop()
+        with open(filepath, "wb") as f:
+            async for chunk in self.stream_proxies(user_id, lang, file_type):
+                await loop.run_in_executor(export_executor, f.write, chunk)
+
     def export_proxies_to_csv(self, filepath: str, proxies: List[Proxy], lang: str) -> None:
         with open(filepath, mode="w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow(COLUMN_TITLES[lang])
             for proxy in proxies:
-                country = COUNTRY_TRANSLATIONS.get(lang, {}).get(proxy.country, proxy.country.upper())
-                writer.writerow([
-                    REVERSE_PROXY_TYPE_MAPPING.get(str(proxy.version), "unknown"),
-                    f"{proxy.host}:{proxy.port}",
-                    proxy.type,
-                    country,
-                    proxy.date_end.strftime("%Y-%m-%d %H:%M") if proxy.date_end else ""
-                ])
+                writer.writerow(proxy_row(proxy, lang))
 
     def export_proxies_to_xls(self, filepath: str, proxies: List[Proxy], lang: str) -> None:
-        wb = Workbook()
-        ws = wb.active
+        # write-only: строки сразу сбрасываются во временный XML, а не держатся в памяти как ячейки
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
         ws.append(COLUMN_TITLES[lang])
         for proxy in proxies:
-            country = COUNTRY_TRANSLATIONS.get(lang, {}).get(proxy.country, proxy.country.upper())
-            ws.append([
-                REVERSE_PROXY_TYPE_MAPPING.get(str(proxy.version), "unknown"),
-                f"{proxy.host}:{proxy.port}",
-                proxy.type,
-                country,
-                proxy.date_end.strftime("%Y-%m-%d %H:%M") if proxy.date_end else ""
-            ])
+            ws.append(proxy_row(proxy, lang))
         wb.save(filepath)
+
+    async def _row_partitions(self, user_id: int) -> AsyncIterator[list]:
+        stmt = (
+            select(*EXPORT_COLUMNS)
+            .where(Proxy.user_id == user_id, Proxy.active)
+            .order_by(Proxy.id)
+            .execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+        )
+        result = await self.session.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
+
+    async def stream_proxies(self, user_id: int, lang: str, file_type: str = "csv") -> AsyncIterator[bytes]:
+        """
+        Выгрузка активных прокси пользователя по частям: строки читаются курсором на стороне сервера
+        пачками по EXPORT_CHUNK_SIZE, каждая пачка отдаётся сразу - память не зависит от размера списка.
+        """
+        if file_type == "zip":
+            async for chunk in self._stream_bundle(user_id, lang):
+                yield chunk
+            return
+
+        encode = CHUNK_ENCODERS[file_type]
+        header = _header(file_type, lang)
+        if header:
+            yield header.encode("utf-8")
+        async for rows in self._row_partitions(user_id):
+            yield encode(rows, lang).encode("utf-8")
+
+    async def _stream_bundle(self, user_id: int, lang: str) -> AsyncIterator[bytes]:
+        """
+        zip из BUNDLE_MEMBERS за один проход по БД: части копятся в SpooledTemporaryFile
+        (в памяти до EXPORT_SPOOL_SIZE, дальше на диске). Запись частей, сборка архива и его чтение
+        идут в export_executor: после EXPORT_SPOOL_SIZE это дисковый ввод-вывод.
+        """
+        loop = asyncio.get_running_loop()
+        parts = {file_type: SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_SIZE) for file_type in BUNDLE_MEMBERS}
+        archive = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_SIZE)
+        try:
+            await loop.run_in_executor(export_executor, self._write_headers, parts, lang)
+            async for rows in self._row_partitions(user_id):
+                await loop.run_in_executor(export_executor, self._write_parts, parts, rows, lang)
+
+            await loop.run_in_executor(export_executor, self._write_bundle, archive, parts)
+            archive.seek(0)
+            while chunk := await loop.run_in_executor(export_executor, archive.read, 64 * 1024):
+                yield chunk
+        finally:
+            archive.close()
+            for part in parts.values():
+                part.close()
+
+    @staticmethod
+    def _write_headers(parts: dict, lang: str) -> None:
+        for file_type, part in parts.items():
+            part.write(_header(file_type, lang).encode("utf-8"))
+
+    @staticmethod
+    def _write_parts(parts: dict, rows: list, lang: str) -> None:
+        for file_type, part in parts.items():
+            part.write(CHUNK_ENCODERS[file_type](rows, lang).encode("utf-8"))
+
+    @staticmethod
+    def _write_bundle(archive, parts: dict) -> None:
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for file_type, part in parts.items():
+                part.seek(0)
+                with zf.open(BUNDLE_MEMBERS[file_type], "w") as member:
+                    shutil.copyfileobj(part, member)
@@ -1,22 +1,46 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.constants import PROXY_TYPE_MAPPING
+from app.core.cache import cache
 from app.core.config import settings
+from app.core.http_client import ProxyApiClient, proxy_api_client
+from app.core.micro_batcher import MicroBatcher
+from app.core.rate_limiter import RateLimitedError
 from app.services.proxy_service import ProxyService
+import asyncio
 import httpx
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Ключи котировок, которые сейчас обновляются в фоне, и ссылки на сами задачи
+_refreshing_quotes: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _upstream_error(error: BaseException) -> tuple[int, str]:
+    # Ошибка запроса к апстриму -> (status_code, error) так же, как в прямом check_proxy
+    if isinstance(error, RateLimitedError):
+        return 429, "Proxy API is busy, try again later"
+    if isinstance(error, httpx.HTTPError):
+        return 502, "Failed to connect to proxy API"
+    return 500, "Internal server error"
+
 
 class ProxyApiService:
     def __init__(self, session: AsyncSession):
         self.session = session
         self.proxy_service = ProxyService(session)
-        self.headers = {
-            "X-Internal-Token": settings.INTERNAL_API_TOKEN
-        }
+        self.api_client = proxy_api_client
+        self.check_batcher = check_batcher
 
-    async def get_proxy_price(self, version: str, quantity: int, days: int, telegram_id: str) -> dict:
+    async def get_proxy_price(self, version: str, quantity: int, days: int, telegram_id: str,
+                              max_age: float | None = None) -> dict:
+        """
+        max_age - максимальный допустимый возраст котировки в секундах (для покупки).
+        Без него действует stale-while-revalidate: устаревшая котировка отдаётся сразу,
+        а свежая запрашивается в фоне.
+        """
         if version not in PROXY_TYPE_MAPPING:
             logger.warning(f"Invalid proxy version received: {version}")
             return {
@@ -26,21 +50,21 @@ class ProxyApiService:
             }
 
         api_version = PROXY_TYPE_MAPPING[version]
-        api_url = f"{settings.PROXY_API_URL}/{settings.PROXY_API_KEY}/getprice"
         params = {
             "version": api_version,
             "count": quantity,
             "period": days
         }
 
-        logger.info(f"Requesting price from external API: {api_url} with params {params}")
-
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(api_url, params=params)
-                response.raise_for_status()
-                price_data = response.json()
-                logger.info(f"Received price data: {price_data}")
+            price_data = await self._get_price_data(params, max_age)
+        except RateLimitedError as e:
+            logger.warning(f"Price request shed by rate limiter: {e}")
+            return {
+                "success": False,
+                "status_code": 429,
+                "error": "Proxy API is busy, try again later"
+            }
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP status error from proxy API: {e.response.status_code} - {e.response.text}")
             return {
@@ -89,6 +113,58 @@ class ProxyApiService:
             "quantity": price_data["count"]
         }
 
+    async def _get_price_data(self, params: dict, max_age: float | None) -> dict:
+        if settings.PRICE_CACHE_TTL <= 0:
+            return await self._fetch_price_data(None, params)
+
+        cache_key = f"proxy:price:{params['version']}:{params['count']}:{params['period']}"
+        cached = await cache.get(cache_key)
+        if cached:
+            age = time.time() - cached["fetched_at"]
+            if max_age is not None:
+                if age <= max_age:
+                    logger.info(f"Price cache hit {cache_key} (age {age:.0f}s <= {max_age}s)")
+                    return cached["data"]
+            elif age <= settings.PRICE_CACHE_TTL:
+                logger.info(f"Price cache hit {cache_key} (age {age:.0f}s)")
+                return cached["data"]
+            else:
+                logger.info(f"Serving stale price {cache_key} (age {age:.0f}s), refreshing in background")
+                self._schedule_price_refresh(cache_key, params)
+                return cached["data"]
+
+        return await self._fetch_price_data(cache_key, params)
+
+    async def _fetch_price_data(self, cache_key: str | None, params: dict) -> dict:
+        logger.info(f"Requesting price from external API with params {params}")
+        price_data = await self.api_client.get("getprice", params)
+        logger.debug(f"Received price data: {price_data}")
+
+        if cache_key and price_data.get("status") == "yes":
+            await cache.set(
+                cache_key,
+                {"data": price_data, "fetched_at": time.time()},
+                ttl=settings.PRICE_CACHE_TTL + settings.PRICE_CACHE_STALE_TTL,
+            )
+        return price_data
+
+    def _schedule_price_refresh(self, cache_key: str, params: dict):
+        if cache_key in _refreshing_quotes:
+            return
+
+        async def refresh():
+            try:
+                await self._fetch_price_data(cache_key, params)
+            except Exception as e:
+                logger.warning(f"Background price refresh failed for {cache_key}: {e}")
+            finally:
+                _refreshing_quotes.discard(cache_key)
+
+        _refreshing_quotes.add(cache_key)
+        task = asyncio.create_task(refresh())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
     async def buy_proxy(self, version: str, quantity: int, days: int, country: str, type_proxy: str, telegram_id: str) -> dict:
         if version not in PROXY_TYPE_MAPPING:
             logger.warning(f"Invalid proxy version received: {version}")
@@ -99,7 +175,6 @@ class ProxyApiService:
             }
 
         api_version = PROXY_TYPE_MAPPING[version]
-        api_url = f"{settings.PROXY_API_URL}/{settings.PROXY_API_KEY}/buy"
         params = {
             "count": quantity,
             "period": days,
@@ -109,18 +184,15 @@ class ProxyApiService:
             "auto_renew": 0
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(api_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-            except httpx.HTTPError as e:
-                logger.error(f"Proxy API error: {e}")
-                return {
-                    "success": False,
-                    "status_code": 502,
-                    "error": f"Proxy API error: {e}"
-                }
+        try:
+            data = await self.api_client.get("buy", params)
+        except httpx.HTTPError as e:
+            logger.error(f"Proxy API error: {e}")
+            return {
+                "success": False,
+                "status_code": 502,
+                "error": f"Proxy API error: {e}"
+            }
 
         if data.get("status") != "yes":
             if data.get("error_id") == 400:
@@ -139,17 +211,24 @@ class ProxyApiService:
             "data": data
         }
 
-    async def check_proxy(self, telegram_id: str, address: str) -> dict:
+    @staticmethod
+    def _parse_address(address: str) -> tuple[str, int] | None:
         try:
-            host, port_str = address.split(":")
-            port = int(port_str)
+            host, port_str = address.strip().split(":")
+            return host, int(port_str)
         except ValueError:
+            return None
+
+    async def check_proxy(self, telegram_id: str, address: str) -> dict:
+        parsed = self._parse_address(address)
+        if parsed is None:
             return {
                 "success": False,
                 "status_code": 400,
                 "error": "Invalid address format. Use 'IP:PORT'"
             }
 
+        host, port = parsed
         proxy = await self.proxy_service.get_proxy_by_telegram_ip_port(telegram_id, host, port)
 
         if proxy and proxy.proxy_id:
@@ -162,16 +241,22 @@ class ProxyApiService:
                 "error": "Proxy not found"
             }
 
-        api_url = f"{settings.PROXY_API_URL}/{settings.PROXY_API_KEY}/check"
+        if settings.PROXY_CHECK_BATCH_WINDOW_MS > 0:
+            return await self._check_proxy_batched(proxy.proxy_id)
+
         params = {
             "ids": proxy.proxy_id
         }
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(api_url, params=params)
-                response.raise_for_status()
-                check_data = response.json()
-                logger.info(f"Received check proxy: {check_data}")
+            check_data = await self.api_client.get("check", params)
+            logger.debug(f"Received check proxy: {check_data}")
+        except RateLimitedError as e:
+            logger.warning(f"Check request shed by rate limiter: {e}")
+            return {
+                "success": False,
+                "status_code": 429,
+                "error": "Proxy API is busy, try again later"
+            }
         except httpx.RequestError as e:
             logger.error(f"Request error when connecting to proxy API: {e}")
             return {
@@ -201,3 +286,123 @@ class ProxyApiService:
             "status_code": 200,
             "proxy_status": check_data.get("proxy_status")
         }
+
+    async def _check_proxy_batched(self, proxy_id: str) -> dict:
+        # Проверки от разных пользователей в пределах окна уходят в апстрим одним запросом
+        try:
+            status = await self.check_batcher.submit(proxy_id)
+        except Exception as e:
+            logger.exception(f"Unexpected error during batched check request: {e}")
+            status_code, error = _upstream_error(e)
+            return {
+                "success": False,
+                "status_code": status_code,
+                "error": error
+            }
+
+        if status["proxy_status"] is None:
+            return {
+                "success": False,
+                "status_code": status.get("status_code", 502),
+                "error": status.get("error", "Failed to connect to proxy API")
+            }
+
+        return {
+            "success": True,
+            "status_code": 200,
+            **status
+        }
+
+    async def check_proxies(self, telegram_id: str, addresses: list[str] | None) -> dict:
+        """
+        Пакетная проверка: все адреса одним запросом в БД, id уходят в апстрим
+        через запятую пачками по PROXY_API_CHECK_BATCH_SIZE.
+        addresses=None - проверить все активные прокси пользователя.
+        """
+        results: dict[str, dict] = {}
+        pairs = None
+        if addresses is not None:
+            pairs = []
+            for address in addresses:
+                parsed = self._parse_address(address)
+                if parsed is None:
+                    results[address] = {"proxy_status": False, "error": "Invalid address format. Use 'IP:PORT'"}
+                else:
+                    pairs.append(parsed)
+
+        proxies = await self.proxy_service.get_proxies_by_telegram_addresses(telegram_id, pairs)
+        found = {f"{proxy.host}:{proxy.port}": proxy.proxy_id for proxy in proxies}
+
+        if addresses is not None:
+            for address in addresses:
+                address = address.strip()
+                if address not in found and address not in results:
+                    results[address] = {"proxy_status": False, "error": "Proxy not found"}
+
+        statuses = await self.check_proxy_ids(list(dict.fromkeys(found.values())))
+        for address, proxy_id in found.items():
+            results[address] = statuses[proxy_id]
+
+        return {
+            "success": True,
+            "status_code": 200,
+            "proxies": [{"address": address, **status} for address, status in results.items()]
+        }
+
+    async def check_proxy_ids(self, proxy_ids: list[str]) -> dict[str, dict]:
+        return await self.fetch_check_statuses(self.api_client, proxy_ids)
+
+    @classmethod
+    async def fetch_check_statuses(cls, api_client: ProxyApiClient, proxy_ids: list[str]) -> dict[str, dict]:
+        batch_size = settings.PROXY_API_CHECK_BATCH_SIZE
+        chunks = [proxy_ids[i:i + batch_size] for i in range(0, len(proxy_ids), batch_size)]
+        responses = await asyncio.gather(
+            *(api_client.get("check", {"ids": ",".join(chunk)}) for chunk in chunks),
+            return_exceptions=True,
+        )
+
+        statuses: dict[str, dict] = {}
+        for chunk, check_data in zip(chunks, responses):
+            if isinstance(check_data, BaseException):
+                logger.error(f"Batch check failed for {len(chunk)} proxies: {check_data}")
+                # status_code несёт вид ошибки до _check_proxy_batched: 429 от лимитера не превращается в 502
+                status_code, error = _upstream_error(check_data)
+                statuses.update({
+                    proxy_id: {"proxy_status": None, "status_code": status_code, "error": error} for proxy_id in chunk
+                })
+            else:
+                statuses.update(cls._parse_check_response(chunk, check_data))
+        return statuses
+
+    @staticmethod
+    def _parse_check_response(proxy_ids: list[str], check_data: dict) -> dict[str, dict]:
+        if check_data.get("status") != "yes":
+            error = check_data.get("error", "Unknown error")
+            return {proxy_id: {"proxy_status": False, "error": error} for proxy_id in proxy_ids}
+
+        # Для нескольких id апстрим отдаёт статусы в "list" по id, для одного - плоский ответ
+        items = check_data.get("list")
+        if isinstance(items, dict):
+            statuses = {}
+            for proxy_id in proxy_ids:
+                item = items.get(str(proxy_id))
+                if item is None:
+                    statuses[proxy_id] = {"proxy_status": None, "error": "No status returned"}
+                else:
+                    proxy_status = item.get("proxy_status") if isinstance(item, dict) else item
+                    statuses[proxy_id] = {"proxy_status": bool(proxy_status)}
+            return statuses
+
+        if len(proxy_ids) == 1:
+            return {proxy_ids[0]: {"proxy_status": check_data.get("proxy_status")}}
+
+        logger.warning(f"Unexpected batch check response for {len(proxy_ids)} ids: {check_data}")
+        return {proxy_id: {"proxy_status": None, "error": "Unexpected response"} for proxy_id in proxy_ids}
+
+
+check_batcher = MicroBatcher(
+    "check",
+    lambda proxy_ids: ProxyApiService.fetch_check_statuses(proxy_api_client, proxy_ids),
+    window=settings.PROXY_CHECK_BATCH_WINDOW_MS / 1000,
+    max_batch_size=settings.PROXY_CHECK_BATCH_MAX_SIZE,
+)
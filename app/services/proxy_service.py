@@ -1,11 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, extract, func, insert, tuple_, update
 from app.schemas.proxy import ProxyItemDB, ProxyItem, ProxyItemResponse
 from app.models.user import User
 from app.models.proxy import Proxy
-from app.core.constants import REVERSE_PROXY_TYPE_MAPPING
-from app.services.file_exporter import FileExporter
+from app.core.config import settings
+from app.services.file_exporter import EXPORT_COLUMNS, STREAM_FORMATS, FileExporter
 from datetime import datetime
 from typing import List
 import logging
@@ -14,10 +14,14 @@ from logging.handlers import RotatingFileHandler
 
 logger = logging.getLogger(__name__)
 
+# 15 колонок на строку: держимся ниже лимита asyncpg в 32767 параметров на запрос
+PROXY_INSERT_CHUNK_SIZE = 1000
+
 critical_handler = RotatingFileHandler(
     "logs/proxy_critical.log",
     maxBytes=1_000_000,
-    backupCount=5
+    backupCount=5,
+    delay=True
 )
 critical_handler.setLevel(logging.ERROR)
 critical_handler.setFormatter(logging.Formatter(
@@ -31,13 +35,24 @@ proxy_critical_logger.propagate = False
 
 
 class ProxyService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
         self.session = session
+        self.autocommit = autocommit
+
+    async def _commit(self):
+        if self.autocommit:
+            await self.session.commit()
+        else:
+            await self.session.flush()
 
     async def create_list_proxy(self, user: User, transaction_id: int, data_from_api: dict):
+        """
+        Сохраняет купленные прокси одним multi-row INSERT в одной транзакции.
+        Строки, не прошедшие валидацию или вставку, пишутся в proxy_critical и не мешают остальным.
+        """
         proxy_list = data_from_api.get("list", {})
         country = data_from_api.get("country")
-        proxies: List[ProxyItem] = []
+        rows: list[tuple[ProxyItemDB, dict]] = []
 
         for proxy_id, proxy_data in proxy_list.items():
             try:
@@ -56,33 +71,19 @@ class ProxyService:
                     unixtime=proxy_data["unixtime"],
                     unixtime_end=proxy_data["unixtime_end"],
                     descr=proxy_data.get("descr", ""),
-                    active=proxy_data["active"]
+                    active=proxy_data["active"],
+                    login=proxy_data.get("user"),
+                    password=proxy_data.get("pass")
                 )
-
-                await self.create_proxy(item)
-
-                proxies.append(ProxyItem(
-                    ip=proxy_data["ip"],
-                    host=proxy_data["host"],
-                    port=proxy_data["port"],
-                    version=proxy_data["version"],
-                    type=proxy_data["type"],
-                    country=country,
-                    date=datetime.strptime(proxy_data["date"], "%Y-%m-%d %H:%M:%S"),
-                    date_end=datetime.strptime(proxy_data["date_end"], "%Y-%m-%d %H:%M:%S"),
-                    unixtime=proxy_data["unixtime"],
-                    unixtime_end=proxy_data["unixtime_end"],
-                    descr=proxy_data.get("descr", ""),
-                    active=proxy_data["active"]
-                ))
             except Exception as e:
-                error_msg = {
-                    "user_id": user.id,
-                    "proxy_data": proxy_data,
-                    "transaction_id": transaction_id,
-                    "error": str(e)
-                }
-                proxy_critical_logger.error(f"[SAVE ERROR] Failed to save proxy: {error_msg}")
+                self._log_save_error(user, transaction_id, proxy_data, e)
+                continue
+            rows.append((item, proxy_data))
+
+        saved = await self._insert_proxies(user, transaction_id, rows)
+        proxies: List[ProxyItem] = [
+            ProxyItem(**item.model_dump(include=set(ProxyItem.model_fields))) for item in saved
+        ]
 
         return {
             "success": True,
@@ -92,6 +93,52 @@ class ProxyService:
             "proxies": proxies
         }
 
+    async def _insert_proxies(self, user: User, transaction_id: int,
+                              rows: list[tuple[ProxyItemDB, dict]]) -> list[ProxyItemDB]:
+        if not rows:
+            return []
+
+        items = [item for item, _ in rows]
+        try:
+            async with self.session.begin_nested():
+                inserted = 0
+                for start in range(0, len(items), PROXY_INSERT_CHUNK_SIZE):
+                    chunk = items[start:start + PROXY_INSERT_CHUNK_SIZE]
+                    result = await self.session.execute(
+                        insert(Proxy).values([item.model_dump() for item in chunk]).returning(Proxy.id)
+                    )
+                    inserted += len(result.all())
+            await self._commit()
+            logger.info(f"Saved {inserted} proxies for transaction {transaction_id}")
+            return items
+        except Exception as e:
+            logger.warning(
+                f"Bulk insert of {len(items)} proxies for transaction {transaction_id} failed, "
+                f"falling back to per-row inserts: {e}"
+            )
+
+        # Пакет откатился до savepoint - сохраняем построчно, чтобы одна плохая строка не теряла остальные
+        saved = []
+        for item, proxy_data in rows:
+            try:
+                async with self.session.begin_nested():
+                    await self.session.execute(insert(Proxy).values(item.model_dump()))
+                saved.append(item)
+            except Exception as e:
+                self._log_save_error(user, transaction_id, proxy_data, e)
+        await self._commit()
+        return saved
+
+    @staticmethod
+    def _log_save_error(user: User, transaction_id: int, proxy_data: dict, error: Exception):
+        error_msg = {
+            "user_id": user.id,
+            "proxy_data": proxy_data,
+            "transaction_id": transaction_id,
+            "error": str(error)
+        }
+        proxy_critical_logger.error(f"[SAVE ERROR] Failed to save proxy: {error_msg}")
+
     async def create_proxy(self, data: ProxyItemDB):
         proxy = Proxy(
             user_id=data.user_id,
@@ -122,25 +169,48 @@ class ProxyService:
         return proxies
 
     def to_proxy_item_response(self, item: ProxyItem) -> ProxyItemResponse:
-        return ProxyItemResponse(
-            **item.model_dump(exclude={"version"}),
-            version=REVERSE_PROXY_TYPE_MAPPING.get(str(item.version), "unknown")
-        )
+        return ProxyItemResponse.model_validate(item, from_attributes=True)
 
-    async def get_active_proxy_by_date(self, deadline: datetime) -> list[Proxy] | None:
-        stmt = select(Proxy).where(
-            Proxy.active,
-            Proxy.date_end < deadline
+    async def deactivate_expired_batch(self, deadline: datetime, batch_size: int) -> list:
+        """
+        Деактивирует до batch_size истёкших прокси одним UPDATE ... RETURNING и фиксирует транзакцию.
+        SKIP LOCKED позволяет нескольким запускам работать параллельно, не блокируя друг друга.
+        """
+        expired_ids = (
+            select(Proxy.id)
+            .where(Proxy.active, Proxy.date_end < deadline)
+            .order_by(Proxy.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Proxy)
+            .where(Proxy.id.in_(expired_ids))
+            .values(active=False)
+            .returning(Proxy.id, Proxy.user_id, Proxy.host, Proxy.port)
+            .execution_options(synchronize_session=False)
         )
-
         result = await self.session.execute(stmt)
-        proxies = result.scalars().all()
-        return proxies if proxies else None
-
-    async def deactivate_proxy_list(self, proxies: list[Proxy]):
-        for proxy in proxies:
-            proxy.active = False
+        rows = result.all()
         await self.session.commit()
+        return rows
+
+    async def deactivate_expired_proxies(self, deadline: datetime, batch_size: int) -> int:
+        total = 0
+        while True:
+            rows = await self.deactivate_expired_batch(deadline, batch_size)
+            if not rows:
+                break
+            total += len(rows)
+            users = len({row.user_id for row in rows})
+            logger.info(
+                f"[EXPIRED] Deactivated {len(rows)} proxies of {users} users "
+                f"(ids {min(row.id for row in rows)}..{max(row.id for row in rows)}), total {total}"
+            )
+            if len(rows) < batch_size:
+                break
+        return total
 
     async def get_proxy_by_telegram_ip_port(self, telegram_id: str, host: str, port: int) -> Proxy | None:
         stmt = (
@@ -160,33 +230,77 @@ class ProxyService:
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_proxies_by_telegram_addresses(self, telegram_id: str,
+                                                addresses: list[tuple[str, int]] | None) -> list:
+        """
+        Активные прокси пользователя одним запросом: по списку (host, port) или все, если addresses=None.
+        Возвращает только колонки proxy_id, host, port без загрузки ORM-объектов.
+        """
+        stmt = (
+            select(Proxy.proxy_id, Proxy.host, Proxy.port)
+            .join(User, Proxy.user_id == User.id)
+            .where(User.telegram_id == telegram_id, Proxy.active)
+        )
+        if addresses is not None:
+            if not addresses:
+                return []
+            stmt = stmt.where(tuple_(Proxy.host, Proxy.port).in_(addresses))
+
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def get_export_rows(self, user: User) -> list:
+        stmt = select(*EXPORT_COLUMNS).where(Proxy.user_id == user.id, Proxy.active).order_by(Proxy.id)
+        return list(await self.session.execute(stmt))
+
+    async def get_list_version(self, user: User) -> str:
+        """
+        Версия списка активных прокси: меняется при покупке, деактивации или продлении.
+        Сумма date_end по всем строкам: продление любого прокси, не только последнего, сдвигает её.
+        """
+        stmt = select(
+            func.count(Proxy.id), func.max(Proxy.id), func.sum(Proxy.id), func.sum(extract("epoch", Proxy.date_end))
+        ).where(Proxy.user_id == user.id, Proxy.active)
+        count, max_id, id_sum, date_end_sum = (await self.session.execute(stmt)).one()
+        return f"{count}:{max_id}:{id_sum}:{date_end_sum}"
+
     async def make_link_proxy_list(self, user: User, file_type: str) -> dict:
-        proxies = await self.get_list_proxy_by_user(user)
-        if not proxies:
+        if file_type != "xls" and file_type not in STREAM_FORMATS:
             return {
                 "success": False,
-                "status_code": 2001,
-                "error": "No proxies found"
+                "status_code": 404,
+                "error": "Invalid file type"
             }
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"proxies_{user.telegram_id}_{timestamp}.{file_type}"
-        filepath = os.path.join("/tmp", filename)
-
-        file_exporter = FileExporter(self.session)
-        if file_type == "csv":
-            file_exporter.export_proxies_to_csv(filepath, proxies, user.language)
-        elif file_type == "xls":
-            file_exporter.export_proxies_to_xls(filepath, proxies, user.language)
-        else:
+        list_version = await self.get_list_version(user)
+        if list_version.startswith("0:"):
             return {
                 "success": False,
-                "status_code": 404,
-                "error": "Invalid file type"
+                "status_code": 2001,
+                "error": "No proxies found"
             }
 
+        filename = FileExporter.artifact_name(user.id, list_version, file_type, user.language)
+        try:
+            # список не менялся - отдаём готовый файл; mtime продлевает ему жизнь в очистке
+            os.utime(os.path.join(settings.EXPORT_DIR, filename))
+        except FileNotFoundError:
+            # файла ещё нет или его только что удалила очистка
+            await self._write_export(user, file_type, filename)
+
         return {
             "success": True,
             "status_code": 200,
             "file_url": f"/static/{filename}"
         }
+
+    async def _write_export(self, user: User, file_type: str, filename: str) -> None:
+        exporter = FileExporter(self.session)
+        if file_type == "xls":
+            proxies = await self.get_export_rows(user)
+            await exporter.export_artifact(
+                filename, lambda path: exporter.export_to_file(file_type, path, proxies, user.language))
+        else:
+            # остальные форматы пишутся потоком за один проход по БД, без загрузки списка в память
+            await exporter.export_artifact(
+                filename, lambda path: exporter.write_stream(path, user.id, file_type, user.language))
@@ -1,17 +1,53 @@
+import asyncio
+import time
+from collections.abc import Collection
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
 from app.models.transaction import Transaction
 from app.services import BalanceService
 from app.models.user import User
-from sqlalchemy import select
+from sqlalchemy import select, update
+from datetime import datetime, timezone
+
+# Статусы, в которых исходный запрос с тем же Idempotency-Key ещё выполняется
+IN_FLIGHT_STATUSES = ("pending", "processing")
 
 
 class TransactionService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, autocommit: bool = True):
         self.session = session
-        self.balance_service = BalanceService(self.session)
+        self.autocommit = autocommit
+        self.balance_service = BalanceService(self.session, autocommit)
+
+    async def _commit(self):
+        if self.autocommit:
+            await self.session.commit()
+        else:
+            await self.session.flush()
+
+    async def _add(self, transaction: Transaction) -> dict | None:
+        """
+        Добавляет транзакцию. Вставка с Idempotency-Key идёт в savepoint: при конфликте ключа
+        откатывается только она, а списание в той же транзакции БД решает вызывающий код.
+        """
+        if transaction.idempotency_key is None:
+            self.session.add(transaction)
+        else:
+            try:
+                async with self.session.begin_nested():
+                    self.session.add(transaction)
+            except IntegrityError:
+                return {
+                    "success": False,
+                    "status_code": 409,
+                    "error": "Duplicate Idempotency-Key"
+                }
+        await self._commit()
+        return None
 
     async def create_refund_transaction(self, user: User, amount: float, new_balance: float, related_ids: str | None):
-        if not user or not user.balance:
+        if not user:
             return {
                 "success": False,
                 "status_code": 404,
@@ -29,7 +65,7 @@ class TransactionService:
         )
 
         self.session.add(transaction)
-        await self.session.commit()
+        await self._commit()
 
         if transaction.id is not None:
             return {
@@ -44,8 +80,10 @@ class TransactionService:
                 "error": "Transaction was not created"
             }
 
-    async def create_wait_proxy_transaction(self, user: User, amount: float, new_balance: float) -> dict:
-        if not user or not user.balance:
+    async def create_wait_proxy_transaction(self, user: User, amount: float, new_balance: float,
+                                            request_data: dict | None = None, status: str = "pending",
+                                            idempotency_key: str | None = None) -> dict:
+        if not user:
             return {
                 "success": False,
                 "status_code": 404,
@@ -57,12 +95,16 @@ class TransactionService:
             amount=amount,
             balance_after=new_balance,
             type="proxy",
-            status="pending",
-            comment=f"Buy proxies for user {user.id}"
+            status=status,
+            comment=f"Buy proxies for user {user.id}",
+            request_data=request_data,
+            idempotency_key=idempotency_key,
+            updated_at=datetime.now(timezone.utc)
         )
 
-        self.session.add(transaction)
-        await self.session.commit()
+        conflict = await self._add(transaction)
+        if conflict:
+            return conflict
 
         if transaction.id is not None:
             return {
@@ -77,8 +119,9 @@ class TransactionService:
                 "error": "Transaction was not created"
             }
 
-    async def create_wait_top_up_transaction(self, user: User, amount: float, new_balance: float, provider_name: str):
-        if not user or not user.balance:
+    async def create_wait_top_up_transaction(self, user: User, amount: float, new_balance: float, provider_name: str,
+                                             idempotency_key: str | None = None):
+        if not user:
             return {
                 "success": False,
                 "status_code": 404,
@@ -92,11 +135,13 @@ class TransactionService:
             provider=provider_name,
             type="topup",
             status="pending",
-            comment=f"Top up by user {user.id}"
+            comment=f"Top up by user {user.id}",
+            idempotency_key=idempotency_key
         )
 
-        self.session.add(transaction)
-        await self.session.commit()
+        conflict = await self._add(transaction)
+        if conflict:
+            return conflict
 
         if transaction.id is not None:
             return {
@@ -111,21 +156,127 @@ class TransactionService:
                 "error": "Transaction was not created"
             }
 
-    async def update_status(self, transaction_id: int, status: str, comment):
+    async def update_status(self, transaction_id: int, status: str, comment, balance_after: float | None = None,
+                            response_data: dict | None = None):
         transaction = await self.session.get(Transaction, transaction_id)
         if transaction:
             transaction.status = status
             transaction.comment += " | " + comment
-            await self.session.commit()
+            transaction.updated_at = datetime.now(timezone.utc)
+            if balance_after is not None:
+                transaction.balance_after = balance_after
+            if response_data is not None:
+                transaction.response_data = response_data
+            await self._commit()
 
-    async def update_external_id(self, transaction_id: int, external_id: str):
+    async def update_external_id(self, transaction_id: int, external_id: str, response_data: dict | None = None):
         transaction = await self.session.get(Transaction, transaction_id)
         if transaction:
             transaction.external_id = external_id
-            await self.session.commit()
+            if response_data is not None:
+                transaction.response_data = response_data
+            await self._commit()
 
-    async def get_transaction_by_external_id(self, external_id: str) -> Transaction | None:
-        raw = await self.session.execute(select(Transaction).where(Transaction.external_id == external_id))
+    async def get_transaction_by_external_id(self, external_id: str, for_update: bool = False) -> Transaction | None:
+        stmt = select(Transaction).where(Transaction.external_id == external_id)
+        if for_update:
+            stmt = stmt.with_for_update()
+        raw = await self.session.execute(stmt)
         transaction = raw.scalar_one_or_none()
 
         return transaction
+
+    async def get_by_idempotency_key(self, user_id: int, idempotency_key: str) -> Transaction | None:
+        stmt = select(Transaction).where(
+            Transaction.user_id == user_id,
+            Transaction.idempotency_key == idempotency_key,
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def wait_for_response(self, transaction_id: int) -> dict:
+        """
+        Ответ исходного запроса с тем же Idempotency-Key. Пока он выполняется, опрашивает БД
+        до IDEMPOTENCY_WAIT_TIMEOUT, затем отвечает 409 - клиент повторит позже.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            stmt = select(Transaction.status, Transaction.response_data).where(Transaction.id == transaction_id)
+            row = (await self.session.execute(stmt)).one()
+            if row.response_data is not None:
+                return row.response_data
+            if row.status not in IN_FLIGHT_STATUSES or time.monotonic() >= deadline:
+                return {
+                    "success": False,
+                    "status_code": 409,
+                    "error": f"Request with this Idempotency-Key is {row.status}",
+                    "transaction_id": transaction_id
+                }
+            # не держим транзакцию БД открытой во время ожидания
+            await self.session.rollback()
+            await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+    async def claim_purchase(self, transaction_id: int) -> Transaction | None:
+        """
+        Переводит задание покупки pending -> processing. Возвращает None, если его уже забрал другой воркер.
+        """
+        stmt = (
+            update(Transaction)
+            .where(Transaction.id == transaction_id, Transaction.type == "proxy", Transaction.status == "pending")
+            .values(status="processing", updated_at=datetime.now(timezone.utc))
+            .returning(Transaction)
+        )
+        transaction = (await self.session.execute(stmt)).scalar_one_or_none()
+        await self._commit()
+        return transaction
+
+    async def get_pending_purchase_ids(self) -> list[int]:
+        stmt = (
+            select(Transaction.id)
+            .where(Transaction.type == "proxy", Transaction.status == "pending", Transaction.request_data.is_not(None))
+            .order_by(Transaction.id)
+        )
+        return list((await self.session.execute(stmt)).scalars())
+
+    async def flag_stale_purchases(self, older_than: datetime, exclude: Collection[int] = ()) -> list[int]:
+        """
+        Покупки, зависшие в processing (процесс упал во время запроса к поставщику): повторять buy нельзя,
+        результат у поставщика неизвестен - помечаем для ручной проверки. exclude - задания, которые ещё в работе.
+        """
+        stmt = (
+            update(Transaction)
+            .where(
+                Transaction.type == "proxy",
+                Transaction.status == "processing",
+                Transaction.updated_at < older_than,
+                Transaction.id.not_in(list(exclude)),
+            )
+            .values(status="review", updated_at=datetime.now(timezone.utc))
+            .returning(Transaction.id)
+        )
+        ids = list((await self.session.execute(stmt)).scalars())
+        await self._commit()
+        return ids
+
+    async def flag_interrupted_purchases(self, transaction_ids: list[int]) -> list[int]:
+        """
+        Покупки, прерванные при остановке воркеров: processing -> review. Уже завершённые не трогаем.
+        """
+        if not transaction_ids:
+            return []
+        stmt = (
+            update(Transaction)
+            .where(Transaction.id.in_(transaction_ids), Transaction.status == "processing")
+            .values(status="review", updated_at=datetime.now(timezone.utc))
+            .returning(Transaction.id)
+        )
+        ids = list((await self.session.execute(stmt)).scalars())
+        await self._commit()
+        return ids
+
+    async def get_purchase(self, transaction_id: int, user_id: int) -> Transaction | None:
+        stmt = select(Transaction).where(
+            Transaction.id == transaction_id,
+            Transaction.user_id == user_id,
+            Transaction.type == "proxy",
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none()
@@ -6,15 +6,26 @@ from sqlalchemy.orm import selectinload
 
 
 class UserService:
+    """
+    Связи моделей объявлены с lazy="raise": каждый метод явно указывает, что загружать вместе с пользователем.
+    Обращение к незагруженной связи - ошибка, а не скрытый запрос к БД.
+    """
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_user_by_id(self, user_id: int) -> User | None:
-        result = await self.session.execute(select(User).options(selectinload(User.balance)).where(User.id == user_id))
+    @staticmethod
+    def _loader_options(with_balance: bool) -> list:
+        return [selectinload(User.balance)] if with_balance else []
+
+    async def get_user_by_id(self, user_id: int, with_balance: bool = True) -> User | None:
+        stmt = select(User).options(*self._loader_options(with_balance)).where(User.id == user_id)
+        result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_user_by_telegram_id(self, telegram_id: str) -> User | None:
-        result = await self.session.execute(select(User).options(selectinload(User.balance)).where(User.telegram_id == telegram_id))
+    async def get_user_by_telegram_id(self, telegram_id: str, with_balance: bool = True) -> User | None:
+        stmt = select(User).options(*self._loader_options(with_balance)).where(User.telegram_id == telegram_id)
+        result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
     async def upsert_user(self, data: UserCreate) -> User:
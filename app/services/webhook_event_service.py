@@ -0,0 +1,66 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.models.webhook_event import WebhookEvent
+
+
+class WebhookEventService:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def append(self, provider: str, invoice_id: str, status: str, payload: dict) -> bool:
+        """
+        Сохраняет колбек в inbox. False - такое событие уже было (повторная доставка провайдером).
+        """
+        stmt = (
+            insert(WebhookEvent)
+            .values(provider=provider, invoice_id=invoice_id, status=status, payload=payload,
+                    state="pending", attempts=0, created_at=datetime.now(timezone.utc))
+            .on_conflict_do_nothing(index_elements=["provider", "invoice_id", "status"])
+            .returning(WebhookEvent.id)
+        )
+        event_id = await self.session.scalar(stmt)
+        await self.session.commit()
+        return event_id is not None
+
+    async def claim_next(self) -> WebhookEvent | None:
+        """
+        Следующее необработанное событие. Строка остаётся заблокированной до конца транзакции,
+        другие воркеры её пропускают (SKIP LOCKED).
+        """
+        stmt = (
+            select(WebhookEvent)
+            .where(WebhookEvent.state == "pending")
+            .order_by(WebhookEvent.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none()
+
+    async def mark_processed(self, event: WebhookEvent, result: dict):
+        # фиксируется вызывающим кодом одним коммитом с изменениями баланса
+        event.state = "processed"
+        event.attempts += 1
+        event.error = None if result.get("status") == "ok" else str(result)
+        event.processed_at = datetime.now(timezone.utc)
+        await self.session.flush()
+
+    async def record_failure(self, event_id: int, error: str) -> str:
+        """
+        Ошибка обработки: событие возвращается в очередь, после WEBHOOK_MAX_ATTEMPTS попыток - failed.
+        """
+        stmt = (
+            update(WebhookEvent)
+            .where(WebhookEvent.id == event_id)
+            .values(
+                attempts=WebhookEvent.attempts + 1,
+                error=error,
+                state=case((WebhookEvent.attempts + 1 >= settings.WEBHOOK_MAX_ATTEMPTS, "failed"), else_="pending"),
+            )
+            .returning(WebhookEvent.state)
+        )
+        state = await self.session.scalar(stmt)
+        await self.session.commit()
+        return state
@@ -2,6 +2,7 @@ import httpx
 from app.interfaces.top_up_strategy import TopUpStrategy
 from app.models.user import User
 from app.core.config import settings
+from app.core.upstream_metrics import UpstreamCall
 from fastapi import Request
 import logging
 
@@ -28,27 +29,30 @@ class CryptoCloudStrategy(TopUpStrategy):
 
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(self.api_url, json=payload, headers=headers)
+                with UpstreamCall("cryptocloud", "invoice_create") as call:
+                    response = await client.post(self.api_url, json=payload, headers=headers)
+                    call.status_code = response.status_code
 
-                if response.status_code != 200:
-                    error = f"[CryptoCloud] Bad status {response.status_code}: {response.text}"
-                    logger.error(error)
-                    return {
-                        "success": False,
-                        "link": "",
-                        "error": error
-                    }
+                    if response.status_code != 200:
+                        error = f"[CryptoCloud] Bad status {response.status_code}: {response.text}"
+                        logger.error(error)
+                        return {
+                            "success": False,
+                            "link": "",
+                            "error": error
+                        }
 
-                data = response.json()
+                    data = response.json()
 
-                if data.get("status") != "success" or "result" not in data or "link" not in data["result"]:
-                    error = f"[CryptoCloud] Unexpected response: {data}"
-                    logger.error(error)
-                    return {
-                        "success": False,
-                        "link": "",
-                        "error": error
-                    }
+                    if data.get("status") != "success" or "result" not in data or "link" not in data["result"]:
+                        call.outcome = "app_error"
+                        error = f"[CryptoCloud] Unexpected response: {data}"
+                        logger.error(error)
+                        return {
+                            "success": False,
+                            "link": "",
+                            "error": error
+                        }
 
                 return {
                     "success": True,
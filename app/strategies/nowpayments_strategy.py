@@ -2,6 +2,7 @@ import httpx
 from app.interfaces.top_up_strategy import TopUpStrategy
 from app.models.user import User
 from app.core.config import settings
+from app.core.upstream_metrics import UpstreamCall
 from fastapi import Request
 import logging
 
@@ -32,32 +33,32 @@ class NowPaymentsStrategy(TopUpStrategy):
 
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(self.api_url, json=payload, headers=headers)
-                print('------------------------------------------------------')
-                print(await response.aread())
-                print('------------------------------------------------------')
+                with UpstreamCall("nowpayments", "invoice_create") as call:
+                    response = await client.post(self.api_url, json=payload, headers=headers)
+                    call.status_code = response.status_code
 
-                if response.status_code != 200:
-                    error = f"[NowPayments] Bad status {response.status_code}: {response.text}"
-                    error_res = f"Bad status {response.status_code}"
-                    logger.error(error)
-                    return {
-                        "success": False,
-                        "link": "",
-                        "error": error_res
-                    }
+                    if response.status_code != 200:
+                        error = f"[NowPayments] Bad status {response.status_code}: {response.text}"
+                        error_res = f"Bad status {response.status_code}"
+                        logger.error(error)
+                        return {
+                            "success": False,
+                            "link": "",
+                            "error": error_res
+                        }
 
-                data = response.json()
+                    data = response.json()
 
-                if "invoice_url" not in data:
-                    error = f"[NowPayments] No invoice_url in response: {data}"
-                    error_res = f"No invoice_url in response: {data}"
-                    logger.error(error)
-                    return {
-                        "success": False,
-                        "link": "",
-                        "error": error_res
-                    }
+                    if "invoice_url" not in data:
+                        call.outcome = "app_error"
+                        error = f"[NowPayments] No invoice_url in response: {data}"
+                        error_res = f"No invoice_url in response: {data}"
+                        logger.error(error)
+                        return {
+                            "success": False,
+                            "link": "",
+                            "error": error_res
+                        }
 
                 return {
                     "success": True,
@@ -0,0 +1,144 @@
+"""
+Бенчмарк сценария покупки: количество COMMIT на одну покупку и пропускная способность
+в режиме unit of work и в прежнем режиме с коммитом на каждом шаге.
+
+Апстрим - заглушка scripts/mock_proxy_vendor.py, вызываемая через ASGI без сети,
+запросы идут через настоящие ProxyApiService / ProxyApiClient.
+
+    python -m scripts.bench_buy_flow --buys 500 --concurrency 20 --quantity 10
+    python -m scripts.bench_buy_flow --dsn sqlite+aiosqlite:///bench_buy.db --concurrency 1
+
+На Postgres нужна накатанная схема; пользователи bench-buy-N создаются при первом запуске.
+"""
+import argparse
+import asyncio
+import httpx
+import time
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.core.config import settings
+from app.core.http_client import ProxyApiClient
+from app.core.sync_db import Base
+from app.models import Balance, User
+from app.orchestrators.proxy import BuyProxyOrchestrator
+from app.schemas.proxy import ProxyBuyRequest
+from scripts import mock_proxy_vendor
+
+USER_PREFIX = "bench-buy-"
+
+
+async def seed_users(sessionmaker, users: int, balance: float):
+    async with sessionmaker() as session:
+        telegram_ids = [f"{USER_PREFIX}{i}" for i in range(users)]
+        existing = set((await session.execute(
+            select(User.telegram_id).where(User.telegram_id.in_(telegram_ids))
+        )).scalars())
+        for telegram_id in telegram_ids:
+            if telegram_id in existing:
+                continue
+            user = User(telegram_id=telegram_id, language="en")
+            session.add(user)
+            await session.flush()
+            session.add(Balance(user_id=user.id, amount=0.0))
+        await session.execute(
+            update(Balance)
+            .where(Balance.user_id.in_(select(User.id).where(User.telegram_id.in_(telegram_ids))))
+            .values(amount=balance)
+        )
+        await session.commit()
+
+
+async def run(sessionmaker, api_client: ProxyApiClient, args, unit_of_work: bool) -> dict:
+    latencies: list[float] = []
+    failed = 0
+    queue = asyncio.Queue()
+    for i in range(args.buys):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal failed
+        while not queue.empty():
+            i = queue.get_nowait()
+            request = ProxyBuyRequest(
+                telegram_id=f"{USER_PREFIX}{i % args.users}",
+                version="ipv4",
+                type="http",
+                country="ru",
+                days=30,
+                quantity=args.quantity,
+            )
+            started = time.perf_counter()
+            try:
+                async with sessionmaker() as session:
+                    orchestrator = BuyProxyOrchestrator(session, unit_of_work=unit_of_work)
+                    orchestrator.proxy_api.api_client = api_client
+                    result = await orchestrator.execute(request)
+                if isinstance(result, dict) and not result.get("success"):
+                    failed += 1
+            except Exception as e:
+                failed += 1
+                print(f"Buy failed: {e!r}")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "failed": failed,
+        "rps": args.buys / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def main(args):
+    mock_proxy_vendor.config.update(latency_ms=args.upstream_latency_ms, jitter_ms=0)
+    api_client = ProxyApiClient(transport=httpx.ASGITransport(app=mock_proxy_vendor.app))
+    api_client.rate_limiter.rate = 0  # сравниваем БД-часть, лимит апстрима не нужен
+
+    engine = create_async_engine(args.dsn)
+    commits = 0
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(conn):
+        nonlocal commits
+        commits += 1
+
+    try:
+        if engine.dialect.name == "sqlite":
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+        results = {}
+        for name, unit_of_work in (("per-step commits", False), ("unit of work", True)):
+            await seed_users(sessionmaker, args.users, args.balance)
+            commits = 0
+            result = await run(sessionmaker, api_client, args, unit_of_work)
+            result["commits_per_buy"] = commits / args.buys
+            results[name] = result
+    finally:
+        await engine.dispose()
+        await api_client.close()
+
+    print(f"\n{args.buys} buys x {args.quantity} proxies, concurrency {args.concurrency}, "
+          f"upstream latency {args.upstream_latency_ms} ms")
+    print(f"{'mode':<18} {'commits/buy':>12} {'buys/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}")
+    for name, r in results.items():
+        print(f"{name:<18} {r['commits_per_buy']:>12.1f} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+              f"{r['failed']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the buy flow commit pattern")
+    parser.add_argument("--dsn", default=settings.POSTGRES_DSN)
+    parser.add_argument("--buys", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--quantity", type=int, default=10, help="proxies per buy")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--balance", type=float, default=1_000_000.0)
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+"""
+Микробенчмарк InternalAuthMiddleware: запросы в секунду через стек middleware
+для прежней реализации на BaseHTTPMiddleware и для чистого ASGI.
+
+Приложение - FastAPI с одним JSON-эндпоинтом, запросы идут через httpx.ASGITransport без сети,
+так что разница - это стоимость самого middleware.
+
+    python -m scripts.bench_middleware --requests 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from app.core.config import settings
+from app.core.middleware import InternalAuthMiddleware
+
+
+class LegacyInternalAuthMiddleware(BaseHTTPMiddleware):
+    # реализация до перехода на чистый ASGI
+    async def dispatch(self, request: Request, call_next):
+        open_paths = ["/docs", "/openapi.json", "/redoc", "/static", "/webhook/cryptocloud/"]
+        if any(request.url.path.startswith(path) for path in open_paths):
+            return await call_next(request)
+
+        token = request.headers.get("X-Internal-Token")
+        if not token or token.strip() != settings.INTERNAL_API_TOKEN.strip():
+            return JSONResponse(
+                status_code=401,
+                content={"detail": "Unauthorized. Invalid or missing token."}
+            )
+
+        return await call_next(request)
+
+
+def build_app(middleware) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return {"success": True, "status_code": 200}
+
+    @app.get("/api/v1/stream")
+    async def stream():
+        async def body():
+            for _ in range(100):
+                yield b"10.0.0.1:8000\n"
+        return StreamingResponse(body(), media_type="text/plain")
+
+    if middleware:
+        app.add_middleware(middleware)
+    return app
+
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    headers = {"X-Internal-Token": settings.INTERNAL_API_TOKEN}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+
+        # прогрев
+        await client.get(path, headers=headers)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+async def main(args):
+    stacks = {
+        "no middleware": None,
+        "BaseHTTPMiddleware": LegacyInternalAuthMiddleware,
+        "pure ASGI": InternalAuthMiddleware,
+    }
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'stack':<20} {'json req/s':>11} {'stream req/s':>13}")
+    for name, middleware in stacks.items():
+        app = build_app(middleware)
+        json_rps = await run(app, "/api/v1/ping", args.requests, args.concurrency)
+        stream_rps = await run(app, "/api/v1/stream", args.requests // 4, args.concurrency)
+        print(f"{name:<20} {json_rps:>11.0f} {stream_rps:>13.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the internal auth middleware")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""
+Бенчмарк XLSX-выгрузки: время и пиковый RSS для прежнего Workbook в памяти и write-only режима,
+плюс максимальная задержка event loop при выгрузке в запросе и через export_executor.
+
+    python -m scripts.bench_xlsx_export
+    python -m scripts.bench_xlsx_export --rows 1000 10000 100000 --output bench_xlsx.json
+
+Каждый замер идёт в отдельном процессе, чтобы пиковый RSS не накапливался между прогонами.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from openpyxl import Workbook
+from app.services.file_exporter import COLUMN_TITLES, FileExporter, proxy_row
+
+LANG = "en"
+
+
+def make_rows(count: int) -> list:
+    return [
+        SimpleNamespace(version=4, host=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", port=10000 + i % 50000,
+                        type="http", country="ru", date_end=datetime(2030, 1, 1))
+        for i in range(count)
+    ]
+
+
+def export_in_memory(filepath: str, proxies: list, lang: str):
+    # прежняя реализация FileExporter.export_proxies_to_xls
+    wb = Workbook()
+    ws = wb.active
+    ws.append(COLUMN_TITLES[lang])
+    for proxy in proxies:
+        ws.append(proxy_row(proxy, lang))
+    wb.save(filepath)
+
+
+ENGINES = {
+    "in-memory": export_in_memory,
+    "write-only": FileExporter(session=None).export_proxies_to_xls,
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss в Linux - килобайты
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(engine: str, count: int, queue):
+    proxies = make_rows(count)
+    baseline = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, "proxies.xlsx")
+        started = time.perf_counter()
+        ENGINES[engine](filepath, proxies, LANG)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(filepath)
+    queue.put({"seconds": elapsed, "peak_rss_mb": peak_rss_mb() - baseline, "file_mb": size / 1024 / 1024})
+
+
+def run_isolated(engine: str, count: int) -> dict:
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(engine, count, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+async def max_loop_stall(count: int, off_loop: bool) -> float:
+    """
+    Максимальный разрыв между тиками фоновой задачи (тик раз в 5 мс) во время выгрузки.
+    """
+    proxies = make_rows(count)
+    stall = 0.0
+    done = False
+
+    async def heartbeat():
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            stall = max(stall, now - last - 0.005)
+            last = now
+
+    task = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.02)
+    exporter = FileExporter(session=None)
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, "proxies.xlsx")
+        if off_loop:
+            await exporter.export_to_file("xls", filepath, proxies, LANG)
+        else:
+            exporter.export_proxies_to_xls(filepath, proxies, LANG)
+        await asyncio.sleep(0.02)
+    done = True
+    await task
+    return stall * 1000
+
+
+def main(args):
+    results = {"export": {}, "loop_stall_ms": {}}
+    print(f"{'rows':>8} {'engine':<11} {'seconds':>8} {'peak RSS MB':>12} {'file MB':>8}")
+    for count in args.rows:
+        for engine in ENGINES:
+            r = run_isolated(engine, count)
+            results["export"][f"{engine}/{count}"] = r
+            print(f"{count:>8} {engine:<11} {r['seconds']:>8.2f} {r['peak_rss_mb']:>12.1f} {r['file_mb']:>8.2f}")
+
+    count = args.stall_rows
+    for name, off_loop in (("in request", False), ("export_executor", True)):
+        stall = asyncio.run(max_loop_stall(count, off_loop))
+        results["loop_stall_ms"][name] = stall
+        print(f"event loop max stall, {count} rows {name}: {stall:.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark XLSX proxy export")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--stall-rows", type=int, default=10_000, help="rows for the event loop stall check")
+    parser.add_argument("--output", help="write results as JSON")
+    main(parser.parse_args())
@@ -0,0 +1,203 @@
+"""
+Нагрузочный тест API против локального Postgres и заглушки поставщика (scripts/mock_proxy_vendor.py).
+
+    uvicorn scripts.mock_proxy_vendor:app --port 8081
+    PROXY_API_URL=http://127.0.0.1:8081 uvicorn main:app --port 8000
+    python -m scripts.load_test --concurrency 50 --duration 60 --mix get_price=5,buy_proxy=1,get_proxy=3,countries=3
+
+Перед запуском создаёт тестовых пользователей (telegram_id loadtest-N) и пополняет им баланс
+напрямую в БД, чтобы покупки не упирались в нехватку средств.
+Выводит throughput и перцентили задержек по каждому эндпоинту; --output сохраняет результат в JSON
+для сравнения с базовым прогоном.
+"""
+import argparse
+import asyncio
+import httpx
+import json
+import random
+import time
+from collections import defaultdict
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.config import settings
+
+USER_PREFIX = "loadtest-"
+VERSIONS = ("ipv4", "ipv6", "ipv4shared")
+COUNTRIES = ("ru", "us", "de")
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.failed: dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, duration: float, error: bool, failed: bool):
+        self.latencies[name].append(duration)
+        if error:
+            self.errors[name] += 1
+        elif failed:
+            self.failed[name] += 1
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def telegram_id(args) -> str:
+    return f"{USER_PREFIX}{random.randrange(args.users)}"
+
+
+async def get_price(client: httpx.AsyncClient, args) -> httpx.Response:
+    return await client.get("/api/v1/get_price", params={
+        "telegram_id": telegram_id(args),
+        "version": random.choice(VERSIONS),
+        "quantity": random.randint(1, 5),
+        "days": random.choice((7, 30, 90)),
+    })
+
+
+async def buy_proxy(client: httpx.AsyncClient, args) -> httpx.Response:
+    return await client.post("/api/v1/buy_proxy", json={
+        "telegram_id": telegram_id(args),
+        "version": random.choice(VERSIONS),
+        "type": "http",
+        "country": random.choice(COUNTRIES),
+        "days": 30,
+        "quantity": random.randint(1, args.max_buy_quantity),
+    })
+
+
+async def get_proxy(client: httpx.AsyncClient, args) -> httpx.Response:
+    return await client.post("/api/v1/get-proxy-telegram-id", json={"telegram_id": telegram_id(args)})
+
+
+async def countries(client: httpx.AsyncClient, args) -> httpx.Response:
+    return await client.get("/api/v1/countries", params={"version": random.choice(VERSIONS)})
+
+
+SCENARIOS = {
+    "get_price": get_price,
+    "buy_proxy": buy_proxy,
+    "get_proxy": get_proxy,
+    "countries": countries,
+}
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def seed_users(client: httpx.AsyncClient, args):
+    for i in range(args.users):
+        response = await client.post("/api/v1/user/upsert", json={
+            "telegram_id": f"{USER_PREFIX}{i}",
+            "chat_id": None,
+            "username": f"loadtest{i}",
+            "firstname": "Load",
+            "language": "en",
+            "notification": False,
+        })
+        response.raise_for_status()
+
+    engine = create_async_engine(settings.POSTGRES_DSN)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(
+                text(
+                    "UPDATE balance SET amount = :amount "
+                    "WHERE user_id IN (SELECT id FROM users WHERE telegram_id LIKE :prefix)"
+                ),
+                {"amount": args.balance, "prefix": f"{USER_PREFIX}%"},
+            )
+    finally:
+        await engine.dispose()
+    print(f"Seeded {args.users} users with balance {args.balance}")
+
+
+async def worker(client: httpx.AsyncClient, args, stats: Stats, deadline: float):
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    while time.monotonic() < deadline:
+        name = random.choices(names, weights)[0]
+        started = time.perf_counter()
+        error = failed = False
+        try:
+            response = await SCENARIOS[name](client, args)
+            error = response.status_code >= 400
+            if not error:
+                body = response.json()
+                failed = isinstance(body, dict) and body.get("success") is False
+        except httpx.HTTPError:
+            error = True
+        stats.record(name, time.perf_counter() - started, error, failed)
+
+
+def report(stats: Stats, elapsed: float) -> dict:
+    result = {"elapsed": elapsed, "endpoints": {}}
+    print(f"\n{'endpoint':<12} {'count':>7} {'rps':>8} {'errors':>7} {'failed':>7} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, latencies in sorted(stats.latencies.items()):
+        row = {
+            "count": len(latencies),
+            "rps": len(latencies) / elapsed,
+            "errors": stats.errors[name],
+            "failed": stats.failed[name],
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+        }
+        result["endpoints"][name] = row
+        print(f"{name:<12} {row['count']:>7} {row['rps']:>8.1f} {row['errors']:>7} {row['failed']:>7} "
+              f"{row['p50']:>8.1f} {row['p95']:>8.1f} {row['p99']:>8.1f} {row['max']:>8.1f}")
+
+    total = sum(len(latencies) for latencies in stats.latencies.values())
+    result["rps"] = total / elapsed
+    print(f"\nTotal: {total} requests in {elapsed:.1f}s, {result['rps']:.1f} req/s")
+    return result
+
+
+async def main(args):
+    headers = {"X-Internal-Token": args.token}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        if not args.skip_seed:
+            await seed_users(client, args)
+
+        stats = Stats()
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(worker(client, args, stats, deadline) for _ in range(args.concurrency)))
+        result = report(stats, time.monotonic() - started)
+
+    if args.output:
+        result["args"] = {"concurrency": args.concurrency, "duration": args.duration, "mix": args.mix}
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the proxy API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default=settings.INTERNAL_API_TOKEN)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("get_price=5,buy_proxy=1,get_proxy=3,countries=3"))
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--balance", type=float, default=1_000_000.0)
+    parser.add_argument("--max-buy-quantity", type=int, default=3)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--output", help="write results as JSON")
+    asyncio.run(main(parser.parse_args()))
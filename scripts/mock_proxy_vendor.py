@@ -0,0 +1,151 @@
+"""
+Локальная заглушка API поставщика прокси для нагрузочных тестов.
+
+Реализует операции, которые использует приложение: getprice, buy, check, getcountry, getcount.
+Запуск:
+    MOCK_VENDOR_LATENCY_MS=80 MOCK_VENDOR_ERROR_RATE=0.01 \
+        uvicorn scripts.mock_proxy_vendor:app --port 8081
+и в .env приложения: PROXY_API_URL=http://127.0.0.1:8081
+
+Задержку и ошибки можно менять на лету: POST /_config {"latency_ms": 200, "error_rate": 0.1}
+Для отдельной операции: {"operations": {"buy": {"latency_ms": 2000}}}
+"""
+import asyncio
+import itertools
+import os
+import random
+from datetime import datetime, timedelta
+from fastapi import FastAPI, HTTPException, Query
+from typing import Optional
+
+COUNTRIES = {
+    "4": ["ru", "us", "de", "nl", "gb", "fr", "pl", "ua", "kz", "jp"],
+    "6": ["ru", "us", "de", "nl", "gb"],
+    "3": ["ru", "us", "de"],
+}
+PRICE_PER_DAY = {"4": 0.06, "6": 0.01, "3": 0.04}
+
+config = {
+    "latency_ms": float(os.getenv("MOCK_VENDOR_LATENCY_MS", "50")),
+    "jitter_ms": float(os.getenv("MOCK_VENDOR_JITTER_MS", "20")),
+    "error_rate": float(os.getenv("MOCK_VENDOR_ERROR_RATE", "0")),
+    "app_error_rate": float(os.getenv("MOCK_VENDOR_APP_ERROR_RATE", "0")),
+    "operations": {},
+}
+stats: dict[str, int] = {}
+proxy_ids = itertools.count(100_000)
+
+app = FastAPI(title="Mock proxy vendor")
+
+
+def _option(operation: str, name: str) -> float:
+    return config["operations"].get(operation, {}).get(name, config[name])
+
+
+async def _simulate(operation: str) -> Optional[dict]:
+    stats[operation] = stats.get(operation, 0) + 1
+
+    latency = _option(operation, "latency_ms") + random.uniform(-1, 1) * _option(operation, "jitter_ms")
+    if latency > 0:
+        await asyncio.sleep(latency / 1000)
+
+    if random.random() < _option(operation, "error_rate"):
+        raise HTTPException(status_code=503, detail="Injected upstream error")
+    if random.random() < _option(operation, "app_error_rate"):
+        return {"status": "no", "error_id": 500, "error": "Injected application error"}
+    return None
+
+
+@app.post("/_config")
+async def update_config(data: dict):
+    config.update({key: value for key, value in data.items() if key != "operations"})
+    for operation, options in data.get("operations", {}).items():
+        config["operations"].setdefault(operation, {}).update(options)
+    return config
+
+
+@app.get("/_stats")
+async def get_stats():
+    return stats
+
+
+@app.get("/{api_key}/getprice")
+async def getprice(api_key: str, version: str = "4", count: int = 1, period: int = 30):
+    if error := await _simulate("getprice"):
+        return error
+    price_single = round(PRICE_PER_DAY.get(version, 0.05) * period, 2)
+    return {
+        "status": "yes",
+        "price": round(price_single * count, 2),
+        "price_single": price_single,
+        "period": period,
+        "count": count,
+        "currency": "USD",
+    }
+
+
+@app.get("/{api_key}/buy")
+async def buy(api_key: str, count: int = 1, period: int = 30, country: str = "ru", version: str = "4",
+              type: str = "http", auto_renew: int = 0):
+    if error := await _simulate("buy"):
+        return error
+
+    now = datetime.now()
+    date_end = now + timedelta(days=period)
+    proxies = {}
+    for _ in range(count):
+        proxy_id = str(next(proxy_ids))
+        ip = f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"
+        proxies[proxy_id] = {
+            "id": proxy_id,
+            "ip": ip,
+            "host": ip,
+            "port": str(random.randint(10_000, 60_000)),
+            "user": f"user{proxy_id}",
+            "pass": f"pass{proxy_id}",
+            "type": type,
+            "version": int(version),
+            "date": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "date_end": date_end.strftime("%Y-%m-%d %H:%M:%S"),
+            "unixtime": int(now.timestamp()),
+            "unixtime_end": int(date_end.timestamp()),
+            "descr": "",
+            "active": "1",
+        }
+
+    price_single = round(PRICE_PER_DAY.get(version, 0.05) * period, 2)
+    return {
+        "status": "yes",
+        "count": count,
+        "price": round(price_single * count, 2),
+        "period": period,
+        "country": country,
+        "list": proxies,
+    }
+
+
+@app.get("/{api_key}/check")
+async def check(api_key: str, ids: str = Query(...)):
+    if error := await _simulate("check"):
+        return error
+    id_list = [proxy_id for proxy_id in ids.split(",") if proxy_id]
+    if len(id_list) == 1:
+        return {"status": "yes", "proxy_id": id_list[0], "proxy_status": True}
+    return {"status": "yes", "list": {proxy_id: {"proxy_status": True} for proxy_id in id_list}}
+
+
+@app.get("/{api_key}/getcountry")
+async def getcountry(api_key: str, version: Optional[str] = None):
+    if error := await _simulate("getcountry"):
+        return error
+    if version:
+        return {"status": "yes", "list": COUNTRIES.get(version, [])}
+    return {"status": "yes", "list": sorted(set(itertools.chain.from_iterable(COUNTRIES.values())))}
+
+
+@app.get("/{api_key}/getcount")
+async def getcount(api_key: str, country: str, version: str = "4"):
+    if error := await _simulate("getcount"):
+        return error
+    available = country in COUNTRIES.get(version, [])
+    return {"status": "yes", "count": random.randint(50, 500) if available else 0}
@@ -0,0 +1,114 @@
+import csv
+import io
+import httpx
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core.app import create_app
+from app.core.config import settings
+from app.core.db import get_async_session, get_session_factory
+from app.core.http_client import ProxyApiClient
+from tests.services.test_file_exporter import create_proxies
+
+
+@pytest.fixture
+def export_sessions():
+    # сессии, открытые через get_session_factory
+    return []
+
+
+@pytest_asyncio.fixture
+async def client(db_engine, export_sessions):
+    sessionmaker = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    async def override_session():
+        async with sessionmaker() as session:
+            yield session
+
+    def override_session_factory():
+        def factory():
+            session = sessionmaker()
+            export_sessions.append(session)
+            return session
+        return factory
+
+    app = create_app()
+    app.dependency_overrides[get_async_session] = override_session
+    app.dependency_overrides[get_session_factory] = override_session_factory
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", headers={"X-Internal-Token": settings.INTERNAL_API_TOKEN}
+    ) as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_export_proxy_streams_csv(client, export_sessions, db_session, create_user):
+    await create_proxies(db_session, create_user)
+
+    response = await client.get(f"{settings.API_V1_STR}/export-proxy", params={"telegram_id": "export"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"].startswith('attachment; filename="proxies_export_')
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["Version", "Ip:Port", "Type", "Country", "Date End"]
+    assert [row[1] for row in rows[1:]] == ["10.0.0.1:8000", "10.0.0.1:8001", "10.0.0.1:8002", "10.0.0.1:8003"]
+    # тело читается через сессию из фабрики, а не через закрытую сессию запроса
+    assert len(export_sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_export_proxy_rejects_unknown_format(client, export_sessions, db_session, create_user):
+    await create_proxies(db_session, create_user)
+
+    response = await client.get(
+        f"{settings.API_V1_STR}/export-proxy", params={"telegram_id": "export", "file_type": "pdf"})
+
+    assert response.json()["status_code"] == 404
+    assert export_sessions == []
+
+
+@pytest.mark.asyncio
+async def test_checker_proxy_batch_checks_found_proxies_in_one_upstream_call(client, db_session, create_user):
+    await create_proxies(db_session, create_user)
+    requested = []
+
+    def vendor_check(request: httpx.Request) -> httpx.Response:
+        ids = request.url.params["ids"].split(",")
+        requested.append(ids)
+        return httpx.Response(200, json={
+            "status": "yes", "list": {proxy_id: {"proxy_status": proxy_id != "1"} for proxy_id in ids}})
+
+    api_client = ProxyApiClient(transport=httpx.MockTransport(vendor_check))
+    with patch("app.services.proxy_api_service.proxy_api_client", api_client):
+        response = await client.post(f"{settings.API_V1_STR}/checker-proxy/batch", json={
+            "telegram_id": "export", "addresses": ["10.0.0.1:8000", "10.0.0.1:8001", "10.0.0.2:1", "bad"]})
+
+    assert response.status_code == 200
+    assert requested == [["0", "1"]]
+    statuses = {item["address"]: item for item in response.json()["proxies"]}
+    assert statuses["10.0.0.1:8000"]["proxy_status"] is True
+    assert statuses["10.0.0.1:8001"]["proxy_status"] is False
+    assert statuses["10.0.0.2:1"]["error"] == "Proxy not found"
+    assert statuses["bad"]["error"].startswith("Invalid address")
+
+
+@pytest.mark.asyncio
+async def test_checker_proxy_batch_reports_upstream_failure_per_proxy(client, db_session, create_user):
+    await create_proxies(db_session, create_user)
+
+    def vendor_down(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    api_client = ProxyApiClient(transport=httpx.MockTransport(vendor_down))
+    with patch("app.services.proxy_api_service.proxy_api_client", api_client), \
+         patch("app.core.http_client.settings.PROXY_API_MAX_RETRIES", 0):
+        response = await client.post(f"{settings.API_V1_STR}/checker-proxy/batch", json={"telegram_id": "export"})
+
+    assert response.status_code == 200
+    proxies = response.json()["proxies"]
+    assert len(proxies) == 4
+    assert all(item["proxy_status"] is None for item in proxies)
+    assert {item["error"] for item in proxies} == {"Failed to connect to proxy API"}
@@ -0,0 +1,80 @@
+import httpx
+import pytest
+import pytest_asyncio
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core.app import create_app
+from app.core.config import settings
+from app.core.db import get_async_session
+from app.models import Proxy, Transaction
+
+TELEGRAM_ID = "555"
+
+
+@pytest_asyncio.fixture
+async def client(db_engine, db_session, create_user):
+    sessionmaker = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    user = await create_user(TELEGRAM_ID, balance=10.0)
+    for i in range(3):
+        db_session.add(Proxy(
+            user_id=user.id, proxy_id=str(i), ip="10.0.0.1", version=4, transaction_id=1,
+            host="10.0.0.1", port=8000 + i, type="http", country="ru",
+            date=datetime(2024, 1, 1), date_end=datetime(2030, 1, 1),
+            unixtime=0, unixtime_end=0, descr="", active=True,
+        ))
+        db_session.add(Transaction(user_id=user.id, amount=1.0, balance_after=10.0, type="buy", status="success"))
+    await db_session.commit()
+
+    async def override_session():
+        async with sessionmaker() as session:
+            yield session
+
+    app = create_app()
+    app.dependency_overrides[get_async_session] = override_session
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", headers={"X-Internal-Token": settings.INTERNAL_API_TOKEN}
+    ) as client:
+        yield client
+
+
+@pytest.fixture
+def queries(db_engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.mark.asyncio
+async def test_get_proxy_by_telegram_id_queries(client, queries):
+    response = await client.post(f"{settings.API_V1_STR}/get-proxy-telegram-id", json={"telegram_id": TELEGRAM_ID})
+
+    assert len(response.json()["proxies"]) == 3
+    assert response.json()["proxies"][0]["version"] == "ipv4"
+    assert response.json()["proxies"][0]["date_end"] == "2030-01-01T00:00:00"
+    # пользователь без связей + список прокси
+    assert len(queries) == 2, queries
+
+
+@pytest.mark.asyncio
+async def test_get_balance_queries(client, queries):
+    response = await client.get(f"{settings.API_V1_STR}/user/get_balance/{TELEGRAM_ID}")
+
+    assert response.json()["amount"] == 10.0
+    # пользователь + баланс, без истории прокси и транзакций
+    assert len(queries) == 2, queries
+
+
+@pytest.mark.asyncio
+async def test_get_user_queries(client, queries):
+    response = await client.get(f"{settings.API_V1_STR}/user/by-telegram-id/{TELEGRAM_ID}")
+
+    assert response.json()["telegram_id"] == TELEGRAM_ID
+    assert len(queries) == 1, queries
@@ -0,0 +1,53 @@
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.api.endpoints.webhook import normalize_nowpayments
+from app.core.app import create_app
+from app.core.config import settings
+from app.core.db import get_async_session
+from app.models import WebhookEvent
+
+
+@pytest_asyncio.fixture
+async def client(db_engine):
+    sessionmaker = async_sessionmaker(db_engine, expire_on_commit=False)
+
+    async def override_session():
+        async with sessionmaker() as session:
+            yield session
+
+    app = create_app()
+    app.dependency_overrides[get_async_session] = override_session
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", headers={"X-Internal-Token": settings.INTERNAL_API_TOKEN}
+    ) as client:
+        yield client
+
+
+def test_normalize_nowpayments_maps_payment_status():
+    payload = {"payment_id": 5077125051, "invoice_id": 4522625843, "payment_status": "finished"}
+
+    assert normalize_nowpayments(payload)["status"] == "success"
+    assert normalize_nowpayments({**payload, "payment_status": "expired"})["status"] == "cancelled"
+    assert normalize_nowpayments({**payload, "payment_status": "waiting"})["status"] == "waiting"
+    assert normalize_nowpayments(payload)["payment_id"] == 5077125051
+
+
+@pytest.mark.asyncio
+async def test_nowpayments_callback_is_stored_with_normalized_status(client, db_session):
+    payload = {"payment_id": 5077125051, "invoice_id": 4522625843, "payment_status": "finished",
+               "order_id": "user_1_tid_1", "pay_amount": 25.0}
+
+    first = await client.post("/webhook/nowpayments/", json=payload)
+    repeat = await client.post("/webhook/nowpayments/", json=payload)
+
+    assert first.json() == {"status": "ok"}
+    assert repeat.json() == {"status": "ok"}
+    events = (await db_session.execute(select(WebhookEvent))).scalars().all()
+    assert len(events) == 1
+    assert (events[0].provider, events[0].invoice_id, events[0].status) == ("nowpayments", "4522625843", "success")
+    assert events[0].payload["status"] == "success"
+    assert events[0].payload["payment_id"] == 5077125051
@@ -0,0 +1,90 @@
+import httpx
+import pytest
+from unittest.mock import patch
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.http_client import ProxyApiClient
+from app.core.retry import RetryBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker("getprice", failure_rate_threshold=0.5, slow_call_duration=1.0,
+                          window_size=4, min_calls=4, open_duration=10, clock=clock)
+
+
+def test_breaker_opens_on_error_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for failed in (False, True, False, True):
+        breaker.before_call()
+        breaker.record(failed=failed, duration=0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 11
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(failed=False, duration=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_on_slow_calls_and_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    for _ in range(4):
+        breaker.before_call()
+        breaker.record(failed=False, duration=2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 11
+    breaker.before_call()
+    breaker.record(failed=True, duration=0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_retry_budget_limits_retries():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1, clock=clock)
+
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_withdraw()
+
+
+@pytest.mark.asyncio
+async def test_client_retries_idempotent_reads_only():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path.rsplit("/", 1)[-1])
+        return httpx.Response(503)
+
+    with patch("app.core.http_client.settings.PROXY_API_RETRY_BASE_DELAY", 0), \
+         patch("app.core.http_client.settings.PROXY_API_MAX_RETRIES", 2):
+        api_client = ProxyApiClient(transport=httpx.MockTransport(handler))
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await api_client.get("getcount", {"version": "4", "country": "ru"})
+        assert calls.count("getcount") == 3
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await api_client.get("buy", {"count": 1})
+        assert calls.count("buy") == 1
+
+    await api_client.close()
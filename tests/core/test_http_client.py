@@ -0,0 +1,38 @@
+import httpx
+import pytest
+from app.core.config import settings
+from app.core.http_client import ProxyApiClient
+
+
+@pytest.mark.asyncio
+async def test_client_is_reused_and_uses_operation_timeout():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json={"status": "yes"})
+
+    api_client = ProxyApiClient(transport=httpx.MockTransport(handler))
+    await api_client.start()
+    first = api_client.client
+
+    await api_client.get("getprice", {"version": "4", "count": 1, "period": 30})
+    await api_client.get("buy", {"count": 1})
+
+    assert api_client.client is first
+    assert str(seen[0].url).startswith(f"{settings.PROXY_API_URL}/{settings.PROXY_API_KEY}/getprice")
+    assert seen[0].extensions["timeout"]["read"] == settings.PROXY_API_TIMEOUTS["getprice"]
+    assert seen[1].extensions["timeout"]["read"] == settings.PROXY_API_TIMEOUTS["buy"]
+
+    await api_client.close()
+    assert first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_client_raises_on_http_error():
+    api_client = ProxyApiClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await api_client.get("getcountry")
+
+    await api_client.close()
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from app.core.micro_batcher import MicroBatcher, batch_size_histogram
+
+
+@pytest.mark.asyncio
+async def test_items_in_window_are_sent_as_one_batch():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+        return {item: f"status-{item}" for item in items}
+
+    batcher = MicroBatcher("test-window", handler, window=0.02, max_batch_size=100)
+    results = await asyncio.gather(*(batcher.submit(item) for item in ["1", "2", "2", "3"]))
+
+    assert results == ["status-1", "status-2", "status-2", "status-3"]
+    assert batches == [["1", "2", "3"]]
+    assert batch_size_histogram.count(batcher="test-window") == 1
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_without_waiting_for_window():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+        return {item: True for item in items}
+
+    batcher = MicroBatcher("test-size", handler, window=10, max_batch_size=2)
+    results = await asyncio.wait_for(asyncio.gather(batcher.submit("1"), batcher.submit("2")), timeout=1)
+
+    assert results == [True, True]
+    assert batches == [["1", "2"]]
+
+
+@pytest.mark.asyncio
+async def test_handler_error_is_propagated_to_every_caller():
+    async def handler(items):
+        raise RuntimeError("upstream down")
+
+    batcher = MicroBatcher("test-error", handler, window=0.01, max_batch_size=10)
+    results = await asyncio.gather(batcher.submit("1"), batcher.submit("2"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
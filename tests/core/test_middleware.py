@@ -0,0 +1,47 @@
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from app.core.middleware import InternalAuthMiddleware
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+async def stream(request):
+    async def body():
+        for i in range(3):
+            yield f"{i}\n".encode()
+    return StreamingResponse(body())
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route("/api", ok), Route("/stream", stream), Route("/docs", ok)])
+    app.add_middleware(InternalAuthMiddleware, token=" secret ")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("headers, status", [
+    ({}, 401),
+    ({"X-Internal-Token": "wrong"}, 401),
+    ({"X-Internal-Token": "secre"}, 401),
+    ({"X-Internal-Token": "secret "}, 200),
+])
+async def test_token_check(client, headers, status):
+    async with client:
+        response = await client.get("/api", headers=headers)
+
+    assert response.status_code == status
+
+
+@pytest.mark.asyncio
+async def test_open_paths_and_streaming(client):
+    async with client:
+        assert (await client.get("/docs")).status_code == 200
+        response = await client.get("/stream", headers={"X-Internal-Token": "secret"})
+
+    assert response.text == "0\n1\n2\n"
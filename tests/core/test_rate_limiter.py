@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from app.core.rate_limiter import (
+    PRIORITY_BUY, PRIORITY_CATALOG, PRIORITY_CHECK, PriorityRateLimiter, RateLimitedError,
+)
+
+
+@pytest.mark.asyncio
+async def test_higher_priority_waiters_are_served_first():
+    limiter = PriorityRateLimiter(rate=100, burst=1)
+    await limiter.acquire(PRIORITY_CATALOG)
+
+    order = []
+
+    async def request(priority, name):
+        await limiter.acquire(priority)
+        order.append(name)
+
+    tasks = [
+        asyncio.ensure_future(request(PRIORITY_CATALOG, "catalog")),
+        asyncio.ensure_future(request(PRIORITY_CHECK, "check")),
+        asyncio.ensure_future(request(PRIORITY_BUY, "buy")),
+    ]
+    await asyncio.sleep(0)
+    assert limiter.queue_depth() == 3
+
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+    assert order == ["buy", "check", "catalog"]
+
+
+@pytest.mark.asyncio
+async def test_low_priority_request_is_shed_when_wait_is_too_long():
+    limiter = PriorityRateLimiter(rate=1, burst=1)
+    await limiter.acquire(PRIORITY_BUY)
+
+    with pytest.raises(RateLimitedError):
+        await limiter.acquire(PRIORITY_CATALOG, max_wait=0.1)
+    assert limiter.queue_depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_disabled_limiter_never_waits():
+    limiter = PriorityRateLimiter(rate=0, burst=0)
+    for _ in range(100):
+        await limiter.acquire(PRIORITY_CATALOG, max_wait=0)
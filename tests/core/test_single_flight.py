@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from app.core.single_flight import SingleFlight, singleflight_calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_request():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"status": "yes", "count": 5}
+
+    coalesced_before = singleflight_calls.value(operation="getcount", role="coalesced")
+    results = await asyncio.gather(*(flight.do("key", fetch, operation="getcount") for _ in range(10)))
+
+    assert calls == 1
+    assert all(result == {"status": "yes", "count": 5} for result in results)
+    assert singleflight_calls.value(operation="getcount", role="coalesced") - coalesced_before == 9
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_error_is_shared_and_next_call_retries():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    with pytest.raises(RuntimeError):
+        await flight.do("key", failing)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_leader():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    first = asyncio.ensure_future(flight.do("key", fetch))
+    second = asyncio.ensure_future(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "ok"
@@ -0,0 +1,36 @@
+import httpx
+import pytest
+from app.core.http_client import ProxyApiClient
+from app.core.upstream_metrics import UpstreamCall, upstream_duration, upstream_requests
+
+
+def test_upstream_call_classifies_outcomes():
+    with UpstreamCall("test", "ok") as call:
+        call.status_code = 200
+    with UpstreamCall("test", "bad_status") as call:
+        call.status_code = 404
+    with pytest.raises(httpx.ReadTimeout):
+        with UpstreamCall("test", "timeout"):
+            raise httpx.ReadTimeout("timed out")
+
+    assert upstream_requests.value(service="test", operation="ok", outcome="success", status="200") == 1
+    assert upstream_requests.value(service="test", operation="bad_status", outcome="http_error", status="404") == 1
+    assert upstream_requests.value(service="test", operation="timeout", outcome="timeout", status="") == 1
+    assert upstream_duration.count(service="test", operation="timeout", outcome="timeout") == 1
+
+
+@pytest.mark.asyncio
+async def test_proxy_api_client_records_app_errors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"status": "no", "error": "Error key"})
+
+    api_client = ProxyApiClient(transport=httpx.MockTransport(handler))
+    before = upstream_requests.value(service="proxy_api", operation="buy", outcome="app_error", status="200")
+
+    await api_client.get("buy", {"count": 1})
+
+    assert upstream_requests.value(
+        service="proxy_api", operation="buy", outcome="app_error", status="200"
+    ) == before + 1
+    assert upstream_duration.count(service="proxy_api", operation="buy", outcome="app_error") >= 1
+    await api_client.close()
@@ -0,0 +1,36 @@
+import asyncio
+
+
+class FakeProxyApiClient:
+    """
+    Подмена ProxyApiClient для офлайн-тестов: отвечает из словарей и запоминает вызовы.
+    """
+
+    def __init__(self, countries: dict[str, list] | None = None, counts: dict[tuple, int] | None = None,
+                 latency: float = 0.0, failing: set[tuple] | None = None):
+        self.countries = countries or {}
+        self.counts = counts or {}
+        self.latency = latency
+        self.failing = failing or set()
+        self.calls: list[tuple[str, dict]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, operation: str, params: dict | None = None) -> dict:
+        params = params or {}
+        self.calls.append((operation, params))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if (operation, *params.values()) in self.failing:
+                raise RuntimeError(f"{operation} failed")
+
+            if operation == "getcountry":
+                return {"status": "yes", "list": self.countries.get(params.get("version"), [])}
+            if operation == "getcount":
+                return {"status": "yes", "count": self.counts.get((params["version"], params["country"]), 0)}
+            return {"status": "no", "error": f"Unsupported operation {operation}"}
+        finally:
+            self.in_flight -= 1
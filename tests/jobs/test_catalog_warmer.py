@@ -0,0 +1,54 @@
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from app.core.cache import cache
+from app.jobs.catalog_warmer import CatalogWarmer, refresh_errors
+from app.services.catalog_service import CatalogService
+from tests.fakes import FakeProxyApiClient
+
+
+@pytest_asyncio.fixture
+async def upstream():
+    await cache.clear()
+    yield FakeProxyApiClient(
+        countries={None: ["ru", "us", "de"], "4": ["ru", "us"], "6": ["de"], "3": []},
+        counts={("4", "ru"): 10, ("4", "us"): 3, ("6", "de"): 7},
+        latency=0.01,
+    )
+    await cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_warmer_fills_cache_for_reads(upstream):
+    with patch("app.jobs.catalog_warmer.settings.CATALOG_WARMER_CONCURRENCY", 2):
+        warmer = CatalogWarmer(CatalogService(api_client=upstream))
+    await warmer.refresh_availability()
+
+    assert upstream.max_in_flight <= 2
+    calls_after_warmup = len(upstream.calls)
+    # getcountry для трёх версий и без версии, getcount для трёх пар
+    assert calls_after_warmup == 4 + 3
+
+    reader = CatalogService(api_client=upstream)
+    assert await reader.get_countries("4") == ["ru", "us"]
+    assert await reader.get_countries(None) == ["ru", "us", "de"]
+    # прогретый пустой список - попадание в кэш, а не запрос к апстриму
+    assert await reader.get_countries("3") == []
+    assert await reader.get_availability("4", "RU") == 10
+    assert await reader.get_availability("6", "de") == 7
+    assert len(upstream.calls) == calls_after_warmup
+
+    assert warmer.staleness("availability") >= 0.0
+
+
+@pytest.mark.asyncio
+async def test_warmer_counts_failed_entries(upstream):
+    upstream.failing = {("getcount", "us", "4")}
+    warmer = CatalogWarmer(CatalogService(api_client=upstream))
+    errors_before = refresh_errors.value(kind="availability")
+
+    await warmer.refresh_availability()
+
+    assert refresh_errors.value(kind="availability") - errors_before == 1
+    assert ("4", "us") not in warmer.refreshed_at["availability"]
+    assert ("4", "ru") in warmer.refreshed_at["availability"]
@@ -0,0 +1,41 @@
+import os
+import time
+from app.jobs.export_sweeper import sweep_export_dir
+
+
+def make_file(directory, name: str, size: int, age: float):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_sweep_removes_expired_then_oldest_over_budget(tmp_path):
+    make_file(tmp_path, "expired.csv", 10, age=7200)
+    make_file(tmp_path, "old.csv", 100, age=300)
+    make_file(tmp_path, "recent.csv", 100, age=60)
+    make_file(tmp_path, "fresh.csv", 100, age=1)
+
+    removed, freed = sweep_export_dir(str(tmp_path), max_age=3600, max_bytes=250)
+
+    assert (removed, freed) == (2, 110)
+    assert sorted(os.listdir(tmp_path)) == ["fresh.csv", "recent.csv"]
+
+
+def test_sweep_keeps_directory_within_limits(tmp_path):
+    make_file(tmp_path, "a.csv", 10, age=10)
+
+    assert sweep_export_dir(str(tmp_path), max_age=3600, max_bytes=100) == (0, 0)
+    assert os.listdir(tmp_path) == ["a.csv"]
+
+
+def test_sweep_skips_files_being_written(tmp_path):
+    make_file(tmp_path, "old.csv", 100, age=300)
+    make_file(tmp_path, "proxies_a.csv.1f2e.tmp", 1000, age=1)
+    make_file(tmp_path, "proxies_b.csv.3c4d.tmp", 10, age=7200)
+
+    removed, freed = sweep_export_dir(str(tmp_path), max_age=3600, max_bytes=250)
+
+    # запись в процессе не трогается и не учитывается в объёме, оборванная удаляется по возрасту
+    assert (removed, freed) == (1, 10)
+    assert sorted(os.listdir(tmp_path)) == ["old.csv", "proxies_a.csv.1f2e.tmp"]
@@ -0,0 +1,128 @@
+import asyncio
+import httpx
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core.http_client import ProxyApiClient
+from app.jobs.purchase_worker import PurchaseWorker
+from app.models import Proxy, Transaction
+from app.orchestrators.proxy import BuyProxyOrchestrator
+from app.schemas.proxy import ProxyBuyRequest
+from tests.orchestrators.proxy.test_buy_proxy import vendor_handler
+
+
+async def reserve_purchase(db_session, create_user, telegram_id: str) -> tuple[int, ProxyApiClient]:
+    await create_user(telegram_id)
+
+    api_client = ProxyApiClient(transport=httpx.MockTransport(vendor_handler))
+    orchestrator = BuyProxyOrchestrator(db_session)
+    orchestrator.proxy_api.api_client = api_client
+    request = ProxyBuyRequest(telegram_id=telegram_id, version="ipv4", type="http", country="us", days=30, quantity=3)
+    reservation = await orchestrator.reserve(request)
+    assert reservation["success"] is True
+    return reservation["transaction_id"], api_client
+
+
+@pytest.mark.asyncio
+async def test_worker_completes_pending_purchase_once(db_engine, db_session, create_user):
+    transaction_id, api_client = await reserve_purchase(db_session, create_user, "job")
+    assert await db_session.scalar(select(Transaction.status)) == "pending"
+
+    worker = PurchaseWorker(concurrency=1, session_factory=async_sessionmaker(db_engine, expire_on_commit=False))
+    with patch("app.services.proxy_api_service.proxy_api_client", api_client):
+        assert await worker.process(transaction_id) == "completed"
+        # повторная доставка того же задания не покупает второй раз
+        assert await worker.process(transaction_id) == "skipped"
+
+    db_session.expire_all()
+    transaction = await db_session.scalar(select(Transaction))
+    assert transaction.status == "completed"
+    assert transaction.request_data["quantity"] == 3
+    assert len(transaction.response_data["proxies"]) == 3
+    assert await db_session.scalar(select(func.count()).select_from(Proxy)) == 3
+
+
+@pytest.mark.asyncio
+async def test_recover_flags_stale_processing_and_requeues_pending(db_engine, db_session, create_user, proxy_critical_log):
+    stale_id, _ = await reserve_purchase(db_session, create_user, "stale")
+    pending_id, _ = await reserve_purchase(db_session, create_user, "pending")
+    stale = await db_session.get(Transaction, stale_id)
+    stale.status = "processing"
+    stale.updated_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    await db_session.commit()
+
+    worker = PurchaseWorker(concurrency=1, session_factory=async_sessionmaker(db_engine, expire_on_commit=False))
+    await worker.recover()
+
+    assert worker.queue.get_nowait() == pending_id
+    assert worker.queue.empty()
+    db_session.expire_all()
+    assert (await db_session.get(Transaction, stale_id)).status == "review"
+    assert f"Transaction {stale_id}" in proxy_critical_log.text
+
+
+@pytest.mark.asyncio
+async def test_stop_flags_cancelled_jobs_for_review(db_engine, db_session, create_user, proxy_critical_log):
+    transaction_id, _ = await reserve_purchase(db_session, create_user, "shutdown")
+
+    async def hanging_vendor(request):
+        await asyncio.Event().wait()
+
+    api_client = ProxyApiClient(transport=httpx.MockTransport(hanging_vendor))
+    worker = PurchaseWorker(concurrency=1, session_factory=async_sessionmaker(db_engine, expire_on_commit=False))
+    with patch("app.services.proxy_api_service.proxy_api_client", api_client), \
+         patch("app.jobs.purchase_worker.settings.PURCHASE_SHUTDOWN_TIMEOUT", 0.05):
+        await worker.start()
+        while transaction_id not in worker._in_flight:
+            await asyncio.sleep(0.01)
+        await worker.stop()
+
+    db_session.expire_all()
+    assert (await db_session.get(Transaction, transaction_id)).status == "review"
+    assert f"Transaction {transaction_id}" in proxy_critical_log.text
+
+
+@pytest.mark.asyncio
+async def test_stale_sweep_flags_processing_left_by_crashed_process(db_engine, db_session, create_user,
+                                                                    proxy_critical_log):
+    transaction_id, _ = await reserve_purchase(db_session, create_user, "crashed")
+    clock = {"now": datetime.now(timezone.utc)}
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock["now"]
+
+    # процесс упал посреди покупки и перезапустился раньше PURCHASE_STALE_SECONDS
+    crashed = await db_session.get(Transaction, transaction_id)
+    crashed.status = "processing"
+    crashed.updated_at = clock["now"]
+    await db_session.commit()
+
+    worker = PurchaseWorker(concurrency=1, session_factory=async_sessionmaker(db_engine, expire_on_commit=False))
+    swept = asyncio.Event()
+    flag_stale = worker.flag_stale
+
+    async def observed_flag_stale():
+        flagged = await flag_stale()
+        if flagged:
+            swept.set()
+        return flagged
+
+    worker.flag_stale = observed_flag_stale
+    with patch("app.jobs.purchase_worker.datetime", FrozenDatetime), \
+         patch("app.jobs.purchase_worker.settings.PURCHASE_STALE_SECONDS", 0.05):
+        await worker.start()
+        db_session.expire_all()
+        assert (await db_session.get(Transaction, transaction_id)).status == "processing"
+
+        clock["now"] += timedelta(hours=1)
+        await asyncio.wait_for(swept.wait(), timeout=10)
+        await worker.stop()
+
+    db_session.expire_all()
+
+    assert (await db_session.get(Transaction, transaction_id)).status == "review"
+    assert f"Transaction {transaction_id}" in proxy_critical_log.text
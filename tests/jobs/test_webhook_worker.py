@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.jobs.webhook_worker import WebhookWorker
+from app.models import Balance, Transaction, User, WebhookEvent
+from app.services import WebhookEventService
+
+
+async def create_topup(db_session, create_user, external_id: str) -> User:
+    user = await create_user("payer", balance=10.0)
+    db_session.add(Transaction(user_id=user.id, amount=25.0, balance_after=35.0, type="topup",
+                               provider="cryptocloud", status="pending", comment="Top up",
+                               external_id=external_id))
+    await db_session.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_duplicate_callbacks_are_applied_once(db_engine, db_session, create_user):
+    await create_topup(db_session, create_user, "INV-1")
+    events = WebhookEventService(db_session)
+    data = {"status": "success", "invoice_id": "INV-1"}
+
+    assert await events.append("cryptocloud", "INV-1", "success", data) is True
+    assert await events.append("cryptocloud", "INV-1", "success", data) is False
+
+    worker = WebhookWorker(concurrency=1, session_factory=async_sessionmaker(db_engine, expire_on_commit=False))
+    assert await worker.process_next() == "ok"
+    assert await worker.process_next() is None
+
+    db_session.expire_all()
+    assert await db_session.scalar(select(Balance.amount)) == pytest.approx(35.0)
+    assert await db_session.scalar(select(Transaction.status)) == "success"
+    assert await db_session.scalar(select(WebhookEvent.state)) == "processed"
+
+
+@pytest.mark.asyncio
+async def test_failed_event_is_retried_then_given_up(db_engine, db_session, create_user):
+    await create_topup(db_session, create_user, "INV-2")
+    await WebhookEventService(db_session).append(
+        "cryptocloud", "INV-2", "success", {"status": "success", "invoice_id": "INV-2"})
+
+    worker = WebhookWorker(concurrency=1, session_factory=async_sessionmaker(db_engine, expire_on_commit=False))
+    with patch("app.jobs.webhook_worker.settings.WEBHOOK_MAX_ATTEMPTS", 2), \
+         patch("app.jobs.webhook_worker.WebhookOrchestrator.execute", side_effect=RuntimeError("db down")):
+        assert await worker.process_next() == "retry"
+        assert await worker.process_next() == "failed"
+        assert await worker.process_next() is None
+
+    db_session.expire_all()
+    event = await db_session.scalar(select(WebhookEvent))
+    assert (event.state, event.attempts) == ("failed", 2)
+    assert await db_session.scalar(select(Balance.amount)) == pytest.approx(10.0)
+
+
+@pytest.mark.asyncio
+async def test_failure_is_recorded_without_releasing_the_claim(db_engine, db_session, create_user):
+    user = await create_topup(db_session, create_user, "INV-3")
+    await WebhookEventService(db_session).append(
+        "cryptocloud", "INV-3", "success", {"status": "success", "invoice_id": "INV-3"})
+
+    async def partial_apply(orchestrator, data):
+        await orchestrator.session.execute(update(Balance).where(Balance.user_id == user.id).values(amount=999.0))
+        raise RuntimeError("crashed after a partial write")
+
+    in_claim_transaction = []
+    record_failure = WebhookEventService.record_failure
+
+    async def spy_record_failure(service, event_id, error):
+        # после полного rollback сессия была бы вне транзакции и FOR UPDATE уже снят
+        in_claim_transaction.append(service.session.in_transaction())
+        return await record_failure(service, event_id, error)
+
+    worker = WebhookWorker(concurrency=1, session_factory=async_sessionmaker(db_engine, expire_on_commit=False))
+    with patch("app.jobs.webhook_worker.WebhookOrchestrator.execute", partial_apply), \
+         patch.object(WebhookEventService, "record_failure", spy_record_failure):
+        assert await worker.process_next() == "retry"
+
+    assert in_claim_transaction == [True]
+    db_session.expire_all()
+    event = await db_session.scalar(select(WebhookEvent))
+    assert (event.state, event.attempts) == ("pending", 1)
+    assert await db_session.scalar(select(Balance.amount)) == pytest.approx(10.0)
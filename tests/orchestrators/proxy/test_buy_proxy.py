@@ -1,11 +1,15 @@
 import sys
 import os
+import httpx
 import pytest
 from unittest.mock import AsyncMock, patch
 from app.orchestrators.proxy import BuyProxyOrchestrator
 from app.schemas.proxy import ProxyBuyRequest, ProxyItem
 from app.services.proxy_service import ProxyService
 from datetime import datetime
+from sqlalchemy import event, func, select
+from app.core.http_client import ProxyApiClient
+from app.models import Balance, Proxy, Transaction
 from typing import List
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
@@ -37,11 +41,9 @@ async def test_successful_buy_proxy():
         mock_user_service.return_value.get_user_by_telegram_id = AsyncMock(return_value=mock_user)
 
         # Баланс
-        mock_balance_service.return_value.check_balance = AsyncMock(return_value={"success": True})
-        mock_balance_service.return_value.check_minus_balance.return_value = 90.0
         mock_balance_service.return_value.check_plus_balance.return_value = 100.0
-        mock_balance_service.return_value.subtract_money = AsyncMock(return_value={"success": True})
-        mock_balance_service.return_value.add_money = AsyncMock(return_value={"success": True})
+        mock_balance_service.return_value.subtract_money = AsyncMock(return_value={"success": True, "new_balance": 90.0})
+        mock_balance_service.return_value.add_money = AsyncMock(return_value={"success": True, "new_balance": 100.0})
 
         # Транзакции
         mock_transaction_service.return_value.create_wait_proxy_transaction = AsyncMock(return_value={
@@ -115,3 +117,71 @@ async def test_successful_buy_proxy():
 
         assert result.success is True
         assert result.status_code == 200
+
+
+def vendor_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/getprice"):
+        return httpx.Response(200, json={
+            "status": "yes", "price": 10.0, "price_single": 10.0 / 3, "period": 30, "count": 3,
+        })
+    return httpx.Response(200, json={
+        "status": "yes",
+        "country": "us",
+        "period": 30,
+        "list": {
+            str(i): {
+                "ip": "1.2.3.4", "host": "1.2.3.4", "port": 8000 + i, "version": 4, "type": "http",
+                "date": "2024-01-01 00:00:00", "date_end": "2024-02-01 00:00:00",
+                "unixtime": 1704067200, "unixtime_end": 1706745600, "descr": "", "active": "1",
+            }
+            for i in range(3)
+        },
+    })
+
+
+@pytest.mark.asyncio
+async def test_buy_proxy_unit_of_work_commits_twice(db_engine, db_session, create_user):
+    await create_user("uow")
+
+    commits = []
+    event.listen(db_engine.sync_engine, "commit", lambda conn: commits.append(conn))
+
+    orchestrator = BuyProxyOrchestrator(db_session)
+    orchestrator.proxy_api.api_client = ProxyApiClient(transport=httpx.MockTransport(vendor_handler))
+    request = ProxyBuyRequest(telegram_id="uow", version="ipv4", type="http", country="us", days=30, quantity=3)
+
+    result = await orchestrator.execute(request)
+
+    assert result.success is True
+    assert len(result.proxies) == 3
+    # резерв (списание + pending) и завершение (прокси + статус)
+    assert len(commits) == 2
+    assert await db_session.scalar(select(Balance.amount)) == pytest.approx(100.0 - result.price)
+    assert await db_session.scalar(select(Transaction.status)) == "completed"
+    assert await db_session.scalar(select(func.count()).select_from(Proxy)) == 3
+
+
+@pytest.mark.asyncio
+async def test_buy_proxy_idempotency_key_replays_stored_result(db_session, create_user):
+    await create_user("idem")
+
+    buys = []
+
+    def counting_handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/buy"):
+            buys.append(request)
+        return vendor_handler(request)
+
+    orchestrator = BuyProxyOrchestrator(db_session)
+    orchestrator.proxy_api.api_client = ProxyApiClient(transport=httpx.MockTransport(counting_handler))
+    request = ProxyBuyRequest(telegram_id="idem", version="ipv4", type="http", country="us", days=30, quantity=3)
+
+    first = await orchestrator.execute(request, idempotency_key="tap-1")
+    second = await orchestrator.execute(request, idempotency_key="tap-1")
+    other = await orchestrator.execute(request.model_copy(update={"quantity": 1}), idempotency_key="tap-1")
+
+    assert len(buys) == 1
+    assert second == first.model_dump(mode="json")
+    assert other["status_code"] == 422
+    assert await db_session.scalar(select(func.count()).select_from(Transaction)) == 1
+    assert await db_session.scalar(select(Balance.amount)) == pytest.approx(100.0 - first.price)
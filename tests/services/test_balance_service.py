@@ -0,0 +1,24 @@
+import pytest
+from app.services.balance_service import BalanceService
+
+
+@pytest.mark.asyncio
+async def test_subtract_money_is_conditional_on_amount(db_session, create_user):
+    user = await create_user(balance=10.0)
+    service = BalanceService(db_session)
+
+    first = await service.subtract_money(user, 6.0)
+    second = await service.subtract_money(user, 6.0)
+
+    assert first == {"success": True, "status_code": 200, "new_balance": 4.0}
+    assert second["status_code"] == 4001
+    assert (await service.add_money(user, 2.5))["new_balance"] == 6.5
+
+
+@pytest.mark.asyncio
+async def test_balance_operations_without_balance_row(db_session, create_user):
+    user = await create_user(balance=None)
+    service = BalanceService(db_session)
+
+    assert (await service.subtract_money(user, 1.0))["status_code"] == 404
+    assert (await service.add_money(user, 1.0))["status_code"] == 404
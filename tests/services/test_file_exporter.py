@@ -0,0 +1,128 @@
+import csv
+import hashlib
+import io
+import json
+import threading
+import zipfile
+import pytest
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from types import SimpleNamespace
+from unittest.mock import patch
+from openpyxl import load_workbook
+from app.models import Proxy, User
+from app.services import FileExporter
+
+
+async def create_proxies(db_session, create_user) -> User:
+    user = await create_user("export", balance=None)
+    for i in range(5):
+        db_session.add(Proxy(
+            user_id=user.id, proxy_id=str(i), ip="10.0.0.1", version=4, transaction_id=1,
+            host="10.0.0.1", port=8000 + i, type="http", country="ru",
+            date=datetime(2024, 1, 1), date_end=datetime(2030, 1, 1, 12, 30),
+            unixtime=0, unixtime_end=0, descr="", active=i != 4,
+            login=f"user{i}" if i else None, password=f"pass{i}" if i else None,
+        ))
+    await db_session.commit()
+    return user
+
+
+@pytest.mark.asyncio
+async def test_stream_proxies_csv_yields_chunks(db_session, create_user):
+    user = await create_proxies(db_session, create_user)
+
+    with patch("app.services.file_exporter.settings.EXPORT_CHUNK_SIZE", 2):
+        chunks = [chunk async for chunk in FileExporter(db_session).stream_proxies(user.id, "en")]
+
+    # заголовок + две пачки по 2 строки
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0] == ["Version", "Ip:Port", "Type", "Country", "Date End"]
+    assert [row[1] for row in rows[1:]] == [f"10.0.0.1:{8000 + i}" for i in range(4)]
+    assert rows[1][4] == "2030-01-01 12:30"
+
+
+@pytest.mark.asyncio
+async def test_stream_proxies_csv_empty_list_has_header(db_session):
+    chunks = [chunk async for chunk in FileExporter(db_session).stream_proxies(999, "ru")]
+
+    assert b"".join(chunks).decode("utf-8").splitlines() == ["Версия,Ip:Порт,Тип,Страна,Дата окончания"]
+
+
+@pytest.mark.asyncio
+async def test_stream_proxies_text_formats(db_session, create_user):
+    user = await create_proxies(db_session, create_user)
+    exporter = FileExporter(db_session)
+
+    async def export(file_type: str) -> str:
+        return b"".join([chunk async for chunk in exporter.stream_proxies(user.id, "en", file_type)]).decode()
+
+    assert (await export("txt")).splitlines()[:2] == ["10.0.0.1:8000", "10.0.0.1:8001"]
+    # без сохранённых логина и пароля строка остаётся host:port
+    assert (await export("txt_auth")).splitlines()[:2] == ["10.0.0.1:8000", "10.0.0.1:8001:user1:pass1"]
+    records = [json.loads(line) for line in (await export("ndjson")).splitlines()]
+    assert len(records) == 4
+    assert records[1] == {
+        "version": "ipv4", "host": "10.0.0.1", "port": 8001, "type": "http", "country": "ru",
+        "date_end": "2030-01-01T12:30:00", "login": "user1", "password": "pass1",
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_proxies_zip_bundle(db_session, create_user):
+    user = await create_proxies(db_session, create_user)
+
+    io_threads = set()
+
+    class RecordingSpool(SpooledTemporaryFile):
+        def write(self, data):
+            io_threads.add(threading.current_thread())
+            return super().write(data)
+
+        def read(self, *args):
+            io_threads.add(threading.current_thread())
+            return super().read(*args)
+
+    # маленький EXPORT_SPOOL_SIZE: части уходят на диск, запись не должна идти в event loop
+    with patch("app.services.file_exporter.settings.EXPORT_CHUNK_SIZE", 2), \
+         patch("app.services.file_exporter.settings.EXPORT_SPOOL_SIZE", 16), \
+         patch("app.services.file_exporter.SpooledTemporaryFile", RecordingSpool):
+        chunks = [chunk async for chunk in FileExporter(db_session).stream_proxies(user.id, "en", "zip")]
+
+    assert io_threads and threading.main_thread() not in io_threads
+    bundle = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert sorted(bundle.namelist()) == ["proxies.csv", "proxies.ndjson", "proxies.txt"]
+    assert len(bundle.read("proxies.csv").decode().splitlines()) == 5
+    assert bundle.read("proxies.txt").decode().splitlines()[3] == "10.0.0.1:8003:user3:pass3"
+
+
+@pytest.mark.asyncio
+async def test_export_to_file_writes_xlsx_off_loop(tmp_path):
+    proxies = [
+        SimpleNamespace(version=4, host="10.0.0.1", port=8000 + i, type="http", country="ru",
+                        date_end=datetime(2030, 1, 1, 12, 30))
+        for i in range(3)
+    ]
+    filepath = tmp_path / "proxies.xlsx"
+
+    await FileExporter(session=None).export_to_file("xls", str(filepath), proxies, "en")
+
+    rows = list(load_workbook(filepath, read_only=True).active.values)
+    assert rows[0] == ("Version", "Ip:Port", "Type", "Country", "Date End")
+    assert [row[1] for row in rows[1:]] == ["10.0.0.1:8000", "10.0.0.1:8001", "10.0.0.1:8002"]
+
+
+def test_artifact_name_is_keyed_by_export_secret():
+    args = (1, "3:3:6:2030-01-01", "txt_auth", "en")
+    plain = hashlib.sha256("1:3:3:6:2030-01-01:txt_auth:en".encode()).hexdigest()
+
+    with patch("app.services.file_exporter.settings.EXPORT_SECRET", "first"):
+        first = FileExporter.artifact_name(*args)
+        assert FileExporter.artifact_name(*args) == first
+    with patch("app.services.file_exporter.settings.EXPORT_SECRET", "second"):
+        second = FileExporter.artifact_name(*args)
+
+    assert first != second
+    assert plain[:32] not in first
+    assert first.endswith(".txt")
@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+import pytest_asyncio
+import time
+from unittest.mock import AsyncMock, patch
+from app.core.cache import cache
+from app.core.circuit_breaker import CircuitOpenError
+from app.core.rate_limiter import PRIORITY_CHECK, RateLimitedError
+from app.services.proxy_api_service import ProxyApiService
+
+PRICE_DATA = {"status": "yes", "price": 10, "price_single": 10, "period": 30, "count": 1}
+CACHE_KEY = "proxy:price:4:1:30"
+
+
+@pytest_asyncio.fixture
+async def service():
+    await cache.clear()
+    service = ProxyApiService(session=AsyncMock())
+    service.api_client = AsyncMock()
+    service.api_client.get = AsyncMock(return_value=PRICE_DATA)
+    yield service
+    await cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_fresh_quote_is_served_from_cache(service):
+    first = await service.get_proxy_price("ipv4", 1, 30, "123")
+    second = await service.get_proxy_price("ipv4", 1, 30, "123")
+
+    assert first == second
+    assert first["total_price"] == 13
+    assert service.api_client.get.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_quote_is_served_and_refreshed_in_background(service):
+    await cache.set(CACHE_KEY, {"data": {**PRICE_DATA, "price": 20}, "fetched_at": time.time() - 100_000})
+
+    result = await service.get_proxy_price("ipv4", 1, 30, "123")
+    assert result["total_price"] == 26
+
+    await asyncio.sleep(0.01)
+    assert service.api_client.get.await_count == 1
+    refreshed = await cache.get(CACHE_KEY)
+    assert refreshed["data"]["price"] == 10
+
+
+@pytest.mark.asyncio
+async def test_max_age_forces_revalidation(service):
+    await cache.set(CACHE_KEY, {"data": {**PRICE_DATA, "price": 20}, "fetched_at": time.time() - 120})
+
+    result = await service.get_proxy_price("ipv4", 1, 30, "123", max_age=60)
+
+    assert result["total_price"] == 13
+    assert service.api_client.get.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_check_uses_one_query_and_chunked_upstream_calls(service):
+    rows = [type("Row", (), {"proxy_id": str(i), "host": "10.0.0.1", "port": 8000 + i})() for i in range(5)]
+    service.proxy_service = AsyncMock()
+    service.proxy_service.get_proxies_by_telegram_addresses = AsyncMock(return_value=rows)
+
+    async def check(operation, params):
+        ids = params["ids"].split(",")
+        return {"status": "yes", "list": {proxy_id: {"proxy_status": proxy_id != "3"} for proxy_id in ids}}
+
+    service.api_client.get = AsyncMock(side_effect=check)
+    addresses = [f"10.0.0.1:{8000 + i}" for i in range(5)] + ["10.0.0.2:1", "bad"]
+
+    with patch("app.services.proxy_api_service.settings.PROXY_API_CHECK_BATCH_SIZE", 2):
+        result = await service.check_proxies("123", addresses)
+
+    service.proxy_service.get_proxies_by_telegram_addresses.assert_awaited_once()
+    assert service.api_client.get.await_count == 3
+    statuses = {item["address"]: item for item in result["proxies"]}
+    assert statuses["10.0.0.1:8000"]["proxy_status"] is True
+    assert statuses["10.0.0.1:8003"]["proxy_status"] is False
+    assert statuses["10.0.0.2:1"]["error"] == "Proxy not found"
+    assert statuses["bad"]["error"].startswith("Invalid address")
+
+
+@pytest.mark.asyncio
+async def test_batched_check_keeps_direct_path_status_codes(service):
+    service.proxy_service = AsyncMock()
+    service.proxy_service.get_proxy_by_telegram_ip_port = AsyncMock(
+        return_value=type("Row", (), {"proxy_id": "7", "host": "10.0.0.1", "port": 8000})())
+    upstream = AsyncMock()
+
+    with patch("app.services.proxy_api_service.settings.PROXY_CHECK_BATCH_WINDOW_MS", 5), \
+         patch("app.services.proxy_api_service.proxy_api_client", upstream):
+        upstream.get = AsyncMock(side_effect=RateLimitedError(PRIORITY_CHECK))
+        rate_limited = await service.check_proxy("123", "10.0.0.1:8000")
+
+        upstream.get = AsyncMock(side_effect=CircuitOpenError("check"))
+        circuit_open = await service.check_proxy("123", "10.0.0.1:8000")
+
+        upstream.get = AsyncMock(return_value={"status": "yes", "proxy_status": True})
+        ok = await service.check_proxy("123", "10.0.0.1:8000")
+
+    assert (rate_limited["status_code"], rate_limited["error"]) == (429, "Proxy API is busy, try again later")
+    assert (circuit_open["status_code"], circuit_open["error"]) == (502, "Failed to connect to proxy API")
+    assert ok == {"success": True, "status_code": 200, "proxy_status": True}
@@ -0,0 +1,142 @@
+import os
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import func, select
+from app.models.proxy import Proxy
+from app.services.proxy_service import ProxyService
+
+
+def vendor_proxy(port: int, **overrides) -> dict:
+    data = {
+        "ip": "10.0.0.1",
+        "host": "10.0.0.1",
+        "port": str(port),
+        "version": 4,
+        "type": "http",
+        "date": "2024-01-01 00:00:00",
+        "date_end": "2024-02-01 00:00:00",
+        "unixtime": 1704067200,
+        "unixtime_end": 1706745600,
+        "descr": "",
+        "active": "1",
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.mark.asyncio
+async def test_create_list_proxy_bulk_inserts_and_skips_invalid_rows(db_session, create_user, proxy_critical_log):
+    user = await create_user("123", balance=None)
+    data = {
+        "country": "ru",
+        "period": 30,
+        "list": {
+            "1": vendor_proxy(8001),
+            "2": vendor_proxy(8002, date="not a date"),
+            "3": vendor_proxy(8003),
+        },
+    }
+
+    result = await ProxyService(db_session).create_list_proxy(user, 42, data)
+
+    assert result["quantity"] == 3
+    assert [proxy.port for proxy in result["proxies"]] == [8001, 8003]
+    rows = (await db_session.execute(select(Proxy.proxy_id, Proxy.transaction_id).order_by(Proxy.id))).all()
+    assert rows == [("1", 42), ("3", 42)]
+    assert [r.name for r in proxy_critical_log.records if r.levelname == "ERROR"] == ["proxy_critical"]
+
+
+@pytest.mark.asyncio
+async def test_create_list_proxy_falls_back_to_per_row_inserts(db_session, create_user, monkeypatch):
+    user = await create_user("123", balance=None)
+    service = ProxyService(db_session)
+    real_execute = db_session.execute
+
+    async def execute(statement, *args, **kwargs):
+        # мультистрочный INSERT падает, одиночные проходят
+        if getattr(statement, "_multi_values", None):
+            raise RuntimeError("bulk insert failed")
+        return await real_execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db_session, "execute", execute)
+    data = {"country": "ru", "list": {"1": vendor_proxy(8001), "2": vendor_proxy(8002)}}
+
+    result = await service.create_list_proxy(user, 7, data)
+
+    assert len(result["proxies"]) == 2
+    count = await real_execute(select(func.count()).select_from(Proxy))
+    assert count.scalar_one() == 2
+
+
+@pytest.mark.asyncio
+async def test_deactivate_expired_proxies_in_chunks(db_session, create_user):
+    user = await create_user("123", balance=None)
+    proxies = {str(i): vendor_proxy(8000 + i) for i in range(5)}
+    proxies["5"] = vendor_proxy(8005, date_end="2030-01-01 00:00:00")
+    await ProxyService(db_session).create_list_proxy(user, 1, {"country": "ru", "list": proxies})
+
+    total = await ProxyService(db_session).deactivate_expired_proxies(datetime(2025, 1, 1), batch_size=2)
+
+    assert total == 5
+    active = await db_session.execute(select(Proxy.proxy_id).where(Proxy.active))
+    assert active.scalars().all() == ["5"]
+
+
+@pytest.mark.asyncio
+async def test_make_link_proxy_list_reuses_artifact_until_list_changes(db_session, create_user, tmp_path):
+    user = await create_user("123", balance=None)
+    service = ProxyService(db_session)
+    await service.create_list_proxy(user, 1, {"country": "ru", "period": 30, "list": {"1": vendor_proxy(8000)}})
+
+    with patch("app.services.proxy_service.settings.EXPORT_DIR", str(tmp_path)):
+        first = await service.make_link_proxy_list(user, "csv")
+        second = await service.make_link_proxy_list(user, "csv")
+        other_format = await service.make_link_proxy_list(user, "xls")
+
+        await service.create_list_proxy(user, 2, {"country": "ru", "period": 30, "list": {"2": vendor_proxy(8001)}})
+        changed = await service.make_link_proxy_list(user, "csv")
+
+    assert first["file_url"] == second["file_url"]
+    assert other_format["file_url"] != first["file_url"]
+    assert changed["file_url"] != first["file_url"]
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        url["file_url"].removeprefix("/static/") for url in (first, other_format, changed))
+
+
+@pytest.mark.asyncio
+async def test_make_link_proxy_list_changes_when_older_proxy_is_renewed(db_session, create_user, tmp_path):
+    user = await create_user("123", balance=None)
+    service = ProxyService(db_session)
+    await service.create_list_proxy(
+        user, 1, {"country": "ru", "period": 30,
+                  "list": {"1": vendor_proxy(8000), "2": vendor_proxy(8001, date_end="2024-03-01 00:00:00")}})
+
+    with patch("app.services.proxy_service.settings.EXPORT_DIR", str(tmp_path)):
+        first = await service.make_link_proxy_list(user, "csv")
+        oldest = await db_session.scalar(select(Proxy).order_by(Proxy.id).limit(1))
+        # продление не последнего прокси: max(date_end) не меняется
+        oldest.date_end = datetime(2024, 2, 15)
+        await db_session.commit()
+        renewed = await service.make_link_proxy_list(user, "csv")
+
+    assert renewed["file_url"] != first["file_url"]
+    with open(tmp_path / renewed["file_url"].removeprefix("/static/")) as f:
+        assert "2024-02-15 00:00" in f.read()
+
+
+@pytest.mark.asyncio
+async def test_make_link_proxy_list_regenerates_swept_file(db_session, create_user, tmp_path):
+    user = await create_user("123", balance=None)
+    service = ProxyService(db_session)
+    await service.create_list_proxy(user, 1, {"country": "ru", "period": 30, "list": {"1": vendor_proxy(8000)}})
+
+    with patch("app.services.proxy_service.settings.EXPORT_DIR", str(tmp_path)):
+        first = await service.make_link_proxy_list(user, "csv")
+        filepath = tmp_path / first["file_url"].removeprefix("/static/")
+        # очистка удалила файл между запросами
+        os.remove(filepath)
+        second = await service.make_link_proxy_list(user, "csv")
+
+    assert second["file_url"] == first["file_url"]
+    assert filepath.exists()